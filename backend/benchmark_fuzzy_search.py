@@ -0,0 +1,94 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+# Add backend directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from recommender import DATASET_PATH
+from search_index import SearchIndex, tokenize
+
+# Misspelled queries to time, and the p99 latency fuzzy search must stay under
+BENCHMARK_QUERIES = int(os.getenv("BENCHMARK_QUERIES", "500"))
+FUZZY_BUDGET_MS = float(os.getenv("FUZZY_BUDGET_MS", "50"))
+LIMIT = 20
+
+ALPHABET = "abcdefghijklmnopqrstuvwxyz"
+
+
+def misspell(word: str, rng):
+    """Applies one random typo: a deletion, substitution, insertion or transposition."""
+    i = int(rng.integers(len(word)))
+    kind = rng.integers(4)
+    if kind == 0:
+        return word[:i] + word[i + 1:]
+    if kind == 1:
+        return word[:i] + rng.choice(list(ALPHABET)) + word[i + 1:]
+    if kind == 2:
+        return word[:i] + rng.choice(list(ALPHABET)) + word[i:]
+    if i == len(word) - 1:
+        i -= 1
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def make_queries(df, count: int, rng):
+    """Artist names and track names with one misspelled word, paired with the row they came from."""
+    queries = []
+    while len(queries) < count:
+        row = int(rng.integers(len(df)))
+        column = "artists" if rng.random() < 0.5 else "track_name"
+        words = tokenize(str(df[column].iloc[row]).split(";")[0])
+        long_words = [i for i, w in enumerate(words) if len(w) >= 4]
+        if not long_words:
+            continue
+        i = long_words[int(rng.integers(len(long_words)))]
+        words[i] = misspell(words[i], rng)
+        queries.append((" ".join(words), row))
+    return queries
+
+
+def run_benchmark():
+    if not os.path.exists(DATASET_PATH):
+        print(f"❌ Dataset not found at {DATASET_PATH}. Please run clean_data.py first.")
+        return False
+
+    print(f"📊 Loading dataset from {DATASET_PATH}...")
+    df = pd.read_csv(DATASET_PATH)
+
+    start = time.time()
+    index = SearchIndex.build(df)
+    print(f"🔨 Built search index over {len(index.terms)} words for {len(df)} tracks in {time.time() - start:.1f}s")
+
+    rng = np.random.default_rng(42)
+    queries = make_queries(df, BENCHMARK_QUERIES, rng)
+    track_ids = df["track_id"].to_numpy()
+
+    results = {}
+    for fuzzy in (False, True):
+        latencies = []
+        found = 0
+        for query, row in queries:
+            t0 = time.perf_counter()
+            rows = index.search(query, LIMIT, fuzzy=fuzzy)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            # duplicated tracks share an id, so count a hit on any copy
+            found += track_ids[row] in set(track_ids[rows])
+        results[fuzzy] = np.percentile(latencies, [50, 95, 99]).tolist() + [max(latencies), found / len(queries)]
+
+    print(f"\n⏱️  {len(queries)} misspelled queries, top {LIMIT} results")
+    print(f"{'mode':<8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'recall':>10}")
+    for fuzzy, (p50, p95, p99, worst, recall) in results.items():
+        print(f"{'fuzzy' if fuzzy else 'exact':<8}{p50:>10.2f}{p95:>10.2f}{p99:>10.2f}{worst:>10.2f}{recall:>10.1%}")
+
+    p99 = results[True][2]
+    if p99 > FUZZY_BUDGET_MS:
+        print(f"\n❌ Fuzzy p99 {p99:.2f}ms exceeds the {FUZZY_BUDGET_MS:.0f}ms budget")
+        return False
+    print(f"\n✅ Fuzzy p99 {p99:.2f}ms is within the {FUZZY_BUDGET_MS:.0f}ms budget")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_benchmark() else 1)
@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+import numpy as np
+
+# Add backend and services directories to path to allow imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "services"))
+
+from recommender import DATA_DIR
+from cooccurrence import COOCCURRENCE_FILE, COOCCURRENCE_TOP_M, SKIP, build_cooccurrence, write_cooccurrence
+from shared.database import SessionLocal
+from shared.models import ListeningHistory
+
+COOCCURRENCE_WORKERS = int(os.getenv("COOCCURRENCE_WORKERS", str(os.cpu_count() or 1)))
+# listening_history rows fetched per round trip
+FETCH_BATCH_SIZE = int(os.getenv("FETCH_BATCH_SIZE", "100000"))
+
+
+def load_listening_events():
+    """(last id, user_ids, track_ids) of every non-skip listening event."""
+    db = SessionLocal()
+    user_ids, track_ids = [], []
+    last_id = 0
+    try:
+        while True:
+            rows = db.query(
+                ListeningHistory.id, ListeningHistory.user_id,
+                ListeningHistory.track_id, ListeningHistory.interaction_type,
+            ).filter(ListeningHistory.id > last_id).order_by(ListeningHistory.id).limit(FETCH_BATCH_SIZE).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            for _, user_id, track_id, kind in rows:
+                if kind != SKIP:
+                    user_ids.append(user_id)
+                    track_ids.append(track_id)
+    finally:
+        db.close()
+    return last_id, user_ids, track_ids
+
+
+def setup_cooccurrence():
+    print("📊 Loading listening history...")
+    built_through, user_ids, track_ids = load_listening_events()
+    if not track_ids:
+        print("❌ No listening history to build from.")
+        return
+
+    print(f"🚀 Counting co-listens for {len(set(track_ids))} tracks over {len(track_ids)} events "
+          f"with {COOCCURRENCE_WORKERS} workers...")
+    start = time.time()
+    items, neighbours, counts, listeners = build_cooccurrence(
+        user_ids, track_ids, COOCCURRENCE_TOP_M, workers=COOCCURRENCE_WORKERS)
+
+    path = os.path.join(DATA_DIR, COOCCURRENCE_FILE)
+    write_cooccurrence(path, items, neighbours, counts, listeners, built_through)
+    filled = float(np.mean(np.count_nonzero(neighbours >= 0, axis=1)))
+    print(f"🏁 Co-occurrence model ({filled:.1f} neighbours per track on average) written to {path} "
+          f"in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    setup_cooccurrence()
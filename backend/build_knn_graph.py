@@ -0,0 +1,40 @@
+import os
+import sys
+import time
+import pandas as pd
+
+# Add backend directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from recommender import DATA_DIR, DATASET_PATH, dataset_version, scale_features
+from vector_index import normalize_rows
+from knn_graph import KNN_GRAPH_FILE, build_knn_graph, write_knn_graph
+
+# Neighbours stored per track; requests with a larger limit fall back to live search
+KNN_GRAPH_K = int(os.getenv("KNN_GRAPH_K", "50"))
+KNN_GRAPH_WORKERS = int(os.getenv("KNN_GRAPH_WORKERS", str(os.cpu_count() or 1)))
+
+
+def setup_knn_graph():
+    if not os.path.exists(DATASET_PATH):
+        print(f"❌ Dataset not found at {DATASET_PATH}. Please run clean_data.py first.")
+        return
+
+    print(f"📊 Loading dataset from {DATASET_PATH}...")
+    df = pd.read_csv(DATASET_PATH)
+
+    # Preprocess features (same as in recommender.py)
+    print("🧹 Preprocessing features...")
+    unit = normalize_rows(scale_features(df))
+
+    print(f"🚀 Computing top-{KNN_GRAPH_K} neighbours for {len(df)} tracks with {KNN_GRAPH_WORKERS} workers...")
+    start = time.time()
+    neighbours, scores = build_knn_graph(unit, KNN_GRAPH_K, workers=KNN_GRAPH_WORKERS)
+
+    path = os.path.join(DATA_DIR, KNN_GRAPH_FILE)
+    write_knn_graph(path, neighbours, scores, dataset_version(DATASET_PATH))
+    print(f"🏁 Neighbour graph written to {path} in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    setup_knn_graph()
@@ -0,0 +1,140 @@
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+try:
+    from .vector_index import normalize_rows
+except ImportError:
+    from vector_index import normalize_rows
+
+# Columnar copy of cleaned_dataset.csv written by clean_data.py, so services
+# can start without parsing the CSV or refitting the scaler:
+#   manifest.json          column order/kinds and the CSV version it was built from
+#   <col>.npy              numeric and boolean columns
+#   <col>.codes.npy        string columns, dictionary-encoded (int32, -1 = missing)
+#   <col>.strings          the dictionary: UTF-8 values separated by NUL bytes
+#   scaled.npy, unit.npy   min-max scaled features and their L2-normalised copy
+CATALOG_DIR_NAME = "catalog"
+MANIFEST_FILE = "manifest.json"
+FORMAT_VERSION = 1
+# tmpfs location run_services.py publishes the catalog to, so every service
+# process maps the same physical pages
+SHARED_CATALOG_DIR = "/dev/shm/spotify_catalog"
+
+
+class Catalog:
+    def __init__(self, df, scaled_features, unit_features, version):
+        self.df = df
+        self.scaled_features = scaled_features
+        self.unit_features = unit_features
+        self.version = version
+
+
+def write_catalog(df, scaled_features, out_dir: str, version: str):
+    """Writes `df` and its precomputed feature matrices as a columnar catalog."""
+    tmp_dir = out_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    columns = []
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+            np.save(os.path.join(tmp_dir, f"{col}.npy"), series.to_numpy())
+            columns.append({"name": col, "kind": "array"})
+        else:
+            codes, uniques = pd.factorize(series)
+            values = [str(v) for v in uniques]
+            if any("\0" in v for v in values):
+                raise ValueError(f"Column '{col}' contains NUL characters and can't be stored in a string table")
+            np.save(os.path.join(tmp_dir, f"{col}.codes.npy"), codes.astype(np.int32))
+            with open(os.path.join(tmp_dir, f"{col}.strings"), "wb") as f:
+                f.write("\0".join(values).encode("utf-8"))
+            columns.append({"name": col, "kind": "strings", "count": len(values)})
+
+    scaled_features = np.asarray(scaled_features, dtype=np.float32)
+    np.save(os.path.join(tmp_dir, "scaled.npy"), scaled_features)
+    np.save(os.path.join(tmp_dir, "unit.npy"), normalize_rows(scaled_features))
+
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+        json.dump({
+            "format": FORMAT_VERSION,
+            "version": version,
+            "rows": len(df),
+            "columns": columns,
+        }, f, indent=2)
+
+    # swap the finished catalog in so readers never see a partial one
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+
+
+def _read_strings(path: str, count: int):
+    with open(path, "rb") as f:
+        blob = f.read()
+    values = blob.decode("utf-8").split("\0") if count else []
+    # trailing slot maps the -1 "missing" code to None
+    return np.array(values + [None], dtype=object)
+
+
+def load_catalog(catalog_dir: str, version: str = None):
+    """
+    Loads a catalog written by write_catalog, memory-mapping the numeric arrays
+    read-only. The frame's numeric columns and both feature matrices stay backed
+    by the mapped files, so processes loading the same catalog share them.
+    Returns None if there is no catalog or it was built from another CSV version.
+    """
+    manifest_path = os.path.join(catalog_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT_VERSION:
+        return None
+    if version is not None and manifest.get("version") != version:
+        print(f"⚠️  Catalog at {catalog_dir} is older than the dataset; re-run clean_data.py to refresh it.")
+        return None
+
+    data = {}
+    for column in manifest["columns"]:
+        col = column["name"]
+        if column["kind"] == "array":
+            data[col] = np.load(os.path.join(catalog_dir, f"{col}.npy"), mmap_mode="r")
+        else:
+            codes = np.load(os.path.join(catalog_dir, f"{col}.codes.npy"), mmap_mode="r")
+            table = _read_strings(os.path.join(catalog_dir, f"{col}.strings"), column["count"])
+            data[col] = table[codes]
+
+    # copy=False keeps each mapped column as its own block instead of consolidating into private memory
+    df = pd.DataFrame(data, columns=[c["name"] for c in manifest["columns"]], copy=False)
+    scaled_features = np.load(os.path.join(catalog_dir, "scaled.npy"), mmap_mode="r")
+    unit_features = np.load(os.path.join(catalog_dir, "unit.npy"), mmap_mode="r")
+    return Catalog(df, scaled_features, unit_features, manifest["version"])
+
+
+def publish_catalog(src_dir: str, dst_dir: str = SHARED_CATALOG_DIR):
+    """
+    Copies a catalog into shared memory (tmpfs) unless an identical version is
+    already published there. Returns the directory services should attach to.
+    """
+    src_manifest = os.path.join(src_dir, MANIFEST_FILE)
+    if not os.path.exists(src_manifest):
+        return None
+    if not os.path.isdir(os.path.dirname(dst_dir)):
+        # no tmpfs on this platform; mapping the on-disk files still shares the page cache
+        return src_dir
+
+    dst_manifest = os.path.join(dst_dir, MANIFEST_FILE)
+    if os.path.exists(dst_manifest):
+        with open(src_manifest) as f, open(dst_manifest) as g:
+            if json.load(f) == json.load(g):
+                return dst_dir
+
+    tmp_dir = dst_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    shutil.copytree(src_dir, tmp_dir)
+    shutil.rmtree(dst_dir, ignore_errors=True)
+    os.replace(tmp_dir, dst_dir)
+    return dst_dir
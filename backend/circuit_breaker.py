@@ -0,0 +1,116 @@
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker around a remote backend.
+
+    - closed: calls go through; `failure_threshold` consecutive failures open it.
+    - open: calls are refused until `reset_timeout` seconds have passed.
+    - half_open: one trial call (or a background probe) decides whether to
+      close again or re-open for another `reset_timeout`.
+
+    If a `probe` callable is given, a daemon thread re-checks an open backend
+    every `probe_interval` seconds, without waiting for `reset_timeout`, and
+    closes the circuit as soon as a probe succeeds, so it recovers even
+    without traffic.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0,
+                 probe=None, probe_interval: float = 10.0, clock=time.monotonic):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.probe = probe
+        self.probe_interval = probe_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._probe_thread = None
+        self.total_failures = 0
+        self.times_opened = 0
+        self.last_error = None
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        # caller holds the lock
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow_request(self):
+        """True if a call may be attempted now; half-open lets a single trial through."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self._failures += 1
+            self.total_failures += 1
+            self.last_error = str(error) if error is not None else None
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._trip()
+
+    def _trip(self):
+        # caller holds the lock
+        if self._state != OPEN:
+            self.times_opened += 1
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._trial_in_flight = False
+        self._start_probe()
+
+    def _start_probe(self):
+        # caller holds the lock
+        if self.probe is None or (self._probe_thread is not None and self._probe_thread.is_alive()):
+            return
+        self._probe_thread = threading.Thread(target=self._probe_loop, name="circuit-breaker-probe", daemon=True)
+        self._probe_thread.start()
+
+    def _probe_loop(self):
+        while True:
+            time.sleep(self.probe_interval)
+            if self.state == CLOSED:
+                return
+            # probes bypass allow_request: they run while open, not just half-open
+            try:
+                self.probe()
+            except Exception as e:
+                self.record_failure(e)
+            else:
+                self.record_success()
+                return
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutive_failures": self._failures,
+                "total_failures": self.total_failures,
+                "times_opened": self.times_opened,
+                "last_error": self.last_error,
+            }
@@ -1,16 +1,35 @@
 import pandas as pd
 import os
+import sys
+
+# Add backend directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from recommender import dataset_version, scale_features
+from catalog import CATALOG_DIR_NAME, write_catalog
 
 # make sure we reference the top‑level data folder (Recommendation root)
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 DATA_DIR = os.path.join(PROJECT_ROOT, "data")
 INPUT_PATH = os.path.join(DATA_DIR, "dataset.csv")
 OUTPUT_PATH = os.path.join(DATA_DIR, "cleaned_dataset.csv")
+CATALOG_PATH = os.path.join(DATA_DIR, CATALOG_DIR_NAME)
+
+def export_catalog(df):
+    """Writes the columnar catalog the services load instead of parsing the CSV."""
+    print("Writing columnar catalog...")
+    write_catalog(df, scale_features(df), CATALOG_PATH, dataset_version(OUTPUT_PATH))
+    print(f"Catalog saved to {CATALOG_PATH}")
 
 def clean_data():
     # create data directory if needed
     os.makedirs(DATA_DIR, exist_ok=True)
     if not os.path.exists(INPUT_PATH):
+        if os.path.exists(OUTPUT_PATH):
+            # already cleaned; just (re)build the catalog from it
+            print(f"Input file not found; exporting catalog from {OUTPUT_PATH}")
+            export_catalog(pd.read_csv(OUTPUT_PATH))
+            return
         print(f"Input file not found at {INPUT_PATH}")
         print("Please place the raw dataset 'dataset.csv' in the top-level data folder.")
         return
@@ -38,5 +57,8 @@ def clean_data():
     print(f"Cleaned dataset saved to {OUTPUT_PATH}")
     print(f"Final shape: {df.shape}")
 
+    # re-read so the catalog holds exactly what the CSV round-trips to
+    export_catalog(pd.read_csv(OUTPUT_PATH))
+
 if __name__ == "__main__":
     clean_data()
@@ -0,0 +1,266 @@
+import os
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Item-item co-listen model, stored next to cleaned_dataset.csv (see build_cooccurrence.py)
+COOCCURRENCE_FILE = "cooccurrence.npz"
+# neighbours kept per track by the batch build
+COOCCURRENCE_TOP_M = int(os.getenv("COOCCURRENCE_TOP_M", "50"))
+# distinct recent tracks per user that a new play is paired with between builds
+COOCCURRENCE_WINDOW = int(os.getenv("COOCCURRENCE_WINDOW", "20"))
+# users whose recent-track window is kept in memory; the least recently
+# active are dropped first
+COOCCURRENCE_MAX_USERS = int(os.getenv("COOCCURRENCE_MAX_USERS", "100000"))
+# listening events before the build replayed at start to refill those windows
+COOCCURRENCE_REPLAY_EVENTS = int(os.getenv("COOCCURRENCE_REPLAY_EVENTS", "200000"))
+# seconds between checks for a newer batch build of the model
+COOCCURRENCE_RELOAD_INTERVAL = float(os.getenv("COOCCURRENCE_RELOAD_INTERVAL", "300"))
+# skipped tracks are not evidence that two tracks go together
+SKIP = "skip"
+
+
+def build_cooccurrence(user_ids, track_ids, top_m: int = COOCCURRENCE_TOP_M,
+                       chunk_size: int = 1024, workers: int = None):
+    """
+    Counts, for every pair of tracks, the users who listened to both
+    (c_ij = (B.T @ B)[i, j] for the binary user x track matrix B), and keeps
+    the top_m neighbours of each track by c_ij / sqrt(n_i * n_j), where n_i
+    is the number of listeners of i.
+
+    Chunks of tracks are multiplied in parallel threads. Returns
+    (items, neighbours [n x top_m] int32, counts [n x top_m] int32,
+    listeners [n] int32); short rows are padded with -1 / 0.
+    """
+    user_codes, _ = pd.factorize(pd.Series(user_ids, dtype=object))
+    item_codes, items = pd.factorize(pd.Series(track_ids, dtype=object))
+    n_users, n_items = int(user_codes.max(initial=-1)) + 1, len(items)
+    played = sparse.csr_matrix(
+        (np.ones(len(user_codes), dtype=np.int32), (user_codes, item_codes)),
+        shape=(n_users, n_items),
+    )
+    played.sum_duplicates()
+    played.data[:] = 1
+    played_t = played.T.tocsr()
+    listeners = np.diff(played_t.indptr).astype(np.int32)
+
+    neighbours = np.full((n_items, top_m), -1, dtype=np.int32)
+    counts = np.zeros((n_items, top_m), dtype=np.int32)
+
+    def count_chunk(start):
+        stop = min(start + chunk_size, n_items)
+        together = played_t[start:stop] @ played
+        for local in range(stop - start):
+            i = start + local
+            lo, hi = together.indptr[local], together.indptr[local + 1]
+            cols = together.indices[lo:hi]
+            pairs = together.data[lo:hi]
+            keep = cols != i
+            cols, pairs = cols[keep], pairs[keep]
+            if len(cols) == 0:
+                continue
+            weights = pairs / np.sqrt(float(listeners[i]) * listeners[cols])
+            if len(cols) > top_m:
+                part = np.argpartition(-weights, top_m - 1)[:top_m]
+                cols, pairs, weights = cols[part], pairs[part], weights[part]
+            order = np.lexsort((cols, -weights))
+            neighbours[i, :len(order)] = cols[order]
+            counts[i, :len(order)] = pairs[order]
+        return stop
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for i, done in enumerate(pool.map(count_chunk, range(0, n_items, chunk_size))):
+            if i % 20 == 0:
+                print(f"✅ Processed {done}/{n_items} tracks...")
+
+    return np.asarray(items, dtype=object), neighbours, counts, listeners
+
+
+def write_cooccurrence(path: str, items, neighbours, counts, listeners, built_through: int):
+    """Saves the model; built_through is the last listening_history id it covers."""
+    # write to a temp file first so running services never load a half-written model
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, items=np.asarray(items, dtype=str), neighbours=neighbours,
+                 counts=counts, listeners=listeners, built_through=np.int64(built_through))
+    os.replace(tmp_path, path)
+
+
+class CooccurrenceModel:
+    """
+    Precomputed top-M co-listened tracks per track, plus the pairs counted
+    from listening events newer than the build.
+
+    New events arrive through `add_events` (an InteractionStore listener).
+    Each play is paired with the user's last COOCCURRENCE_WINDOW distinct
+    tracks; those counts are kept apart and merged in when a track's
+    neighbours are read, so the arrays themselves never change. When a newer
+    batch build is written, `reload` swaps it in and keeps only the counts of
+    events it doesn't cover, so pending state is bounded by the build cadence.
+    """
+
+    def __init__(self, items=None, neighbours=None, counts=None, listeners=None, built_through: int = 0,
+                 path: str = None):
+        self.path = path
+        self.mtime = None
+        self._set_base(items, neighbours, counts, listeners, built_through)
+        self._recent = OrderedDict()
+        self._pending = defaultdict(Counter)
+        self._pending_listeners = Counter()
+        # (event id, track id, tracks it was paired with) of every pending play
+        self._pending_log = []
+        self._lock = threading.Lock()
+        self._reload_thread = None
+
+    def _set_base(self, items, neighbours, counts, listeners, built_through):
+        self.items = np.asarray(items if items is not None else [], dtype=object)
+        self.item_index = {t: i for i, t in enumerate(self.items.tolist())}
+        self.neighbours = neighbours if neighbours is not None else np.zeros((0, 0), dtype=np.int32)
+        self.counts = counts if counts is not None else np.zeros((0, 0), dtype=np.int32)
+        self.listeners = listeners if listeners is not None else np.zeros(0, dtype=np.int32)
+        self.built_through = built_through
+
+    @staticmethod
+    def _read(path: str):
+        with np.load(path, allow_pickle=False) as data:
+            return (data["items"].astype(object), data["neighbours"], data["counts"],
+                    data["listeners"], int(data["built_through"]))
+
+    @classmethod
+    def open(cls, path: str):
+        """Loads a model written by write_cooccurrence, or returns an empty one."""
+        if not os.path.exists(path):
+            return cls(path=path)
+        try:
+            mtime = os.path.getmtime(path)
+            model = cls(*cls._read(path), path=path)
+            model.mtime = mtime
+            return model
+        except Exception as e:
+            print(f"⚠️  Could not load co-occurrence model from {path}: {e}")
+            return cls(path=path)
+
+    def replay_from(self):
+        """Listening event id to start feeding add_events after: shortly before the build."""
+        return max(0, self.built_through - COOCCURRENCE_REPLAY_EVENTS)
+
+    def reload(self):
+        """
+        Swaps in the model file if a newer build was written; pending counts
+        of the events it covers are dropped. Returns True if it swapped.
+        """
+        if self.path is None or not os.path.exists(self.path):
+            return False
+        try:
+            mtime = os.path.getmtime(self.path)
+            if mtime == self.mtime:
+                return False
+            base = self._read(self.path)
+        except Exception as e:
+            print(f"⚠️  Could not reload co-occurrence model from {self.path}: {e}")
+            return False
+        self.mtime = mtime
+        with self._lock:
+            if base[-1] <= self.built_through:
+                return False
+            self._set_base(*base)
+            log = [entry for entry in self._pending_log if entry[0] > self.built_through]
+            self._pending = defaultdict(Counter)
+            self._pending_listeners = Counter()
+            self._pending_log = []
+            for entry in log:
+                self._count(*entry)
+        print(f"✅ Reloaded co-occurrence model built through event {self.built_through}")
+        return True
+
+    def start_reloading(self, interval: float = COOCCURRENCE_RELOAD_INTERVAL):
+        """Checks for a newer build every `interval` seconds on a daemon thread."""
+        if self._reload_thread is not None:
+            return
+        self._reload_thread = threading.Thread(target=self._reload_loop, args=(interval,),
+                                               name="cooccurrence-reload", daemon=True)
+        self._reload_thread.start()
+
+    def _reload_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            self.reload()
+
+    def _count(self, event_id, track_id, others):
+        # caller holds the lock
+        for other in others:
+            self._pending[track_id][other] += 1
+            self._pending[other][track_id] += 1
+        self._pending_listeners[track_id] += 1
+        self._pending_log.append((event_id, track_id, others))
+
+    def add_events(self, ids, user_ids, track_ids, interaction_types):
+        """Counts co-listens from events the batch build hasn't seen."""
+        with self._lock:
+            for event_id, user_id, track_id, kind in zip(ids.tolist(), user_ids.tolist(), track_ids, interaction_types):
+                if kind == SKIP:
+                    continue
+                recent = self._recent.pop(user_id, None) or []
+                if track_id in recent:
+                    recent.remove(track_id)
+                elif event_id > self.built_through:
+                    self._count(event_id, track_id, tuple(recent))
+                recent.append(track_id)
+                if len(recent) > COOCCURRENCE_WINDOW:
+                    del recent[0]
+                self._recent[user_id] = recent
+                if len(self._recent) > COOCCURRENCE_MAX_USERS:
+                    self._recent.popitem(last=False)
+
+    def _listeners(self, track_id):
+        # caller holds the lock
+        row = self.item_index.get(track_id)
+        base = int(self.listeners[row]) if row is not None else 0
+        return base + self._pending_listeners.get(track_id, 0)
+
+    def neighbours_of(self, track_id, limit: int = COOCCURRENCE_TOP_M):
+        """Returns (track_ids, weights) co-listened with `track_id`, best first."""
+        together = {}
+        with self._lock:
+            row = self.item_index.get(track_id)
+            if row is not None:
+                cols = self.neighbours[row]
+                keep = cols >= 0
+                together = dict(zip(self.items[cols[keep]].tolist(), self.counts[row][keep].tolist()))
+            for other, count in self._pending.get(track_id, {}).items():
+                together[other] = together.get(other, 0) + count
+            if not together:
+                return [], np.zeros(0, dtype=np.float32)
+            others = list(together)
+            n_i = self._listeners(track_id)
+            n_j = np.array([self._listeners(t) for t in others], dtype=np.float64)
+        weights = np.fromiter(together.values(), dtype=np.float64, count=len(others)) / np.sqrt(n_i * n_j)
+        order = np.argsort(-weights, kind="stable")[:limit]
+        return [others[i] for i in order], weights[order].astype(np.float32)
+
+    def score(self, track_ids, exclude=(), limit: int = COOCCURRENCE_TOP_M):
+        """
+        Sums the neighbour lists of `track_ids`; returns (track_ids, scores),
+        best first, leaving out `exclude` and the seeds themselves.
+        """
+        scores = Counter()
+        for track_id in track_ids:
+            others, weights = self.neighbours_of(track_id, limit)
+            for other, weight in zip(others, weights.tolist()):
+                scores[other] += weight
+        skip = set(exclude) | set(track_ids)
+        ranked = [(t, s) for t, s in scores.most_common() if t not in skip]
+        return [t for t, _ in ranked], np.array([s for _, s in ranked], dtype=np.float32)
+
+    def stats(self):
+        return {
+            "tracks": len(self.items),
+            "top_m": self.neighbours.shape[1],
+            "built_through": self.built_through,
+            "pending_events": len(self._pending_log),
+            "users_tracked": len(self._recent),
+        }
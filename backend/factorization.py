@@ -0,0 +1,176 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+try:
+    from .vector_index import top_k
+except ImportError:
+    from vector_index import top_k
+
+# Implicit ALS factors, stored next to cleaned_dataset.csv (see train_als.py).
+# The factor matrices are plain .npy files so services can memory-map them.
+ALS_USER_FACTORS_FILE = "als_user_factors.npy"
+ALS_ITEM_FACTORS_FILE = "als_item_factors.npy"
+ALS_IDS_FILE = "als_ids.npz"
+
+ALS_FACTORS = int(os.getenv("ALS_FACTORS", "64"))
+ALS_REGULARIZATION = float(os.getenv("ALS_REGULARIZATION", "0.1"))
+ALS_ITERATIONS = int(os.getenv("ALS_ITERATIONS", "15"))
+# confidence = 1 + ALS_ALPHA * |summed interaction weights|
+ALS_ALPHA = float(os.getenv("ALS_ALPHA", "10"))
+
+# Weight of each interaction type; a track the user mostly skipped ends up
+# with a negative sum, i.e. a confident "not preferred"
+INTERACTION_WEIGHTS = {"play": 1.0, "like": 4.0, "skip": -1.0}
+
+
+def interaction_matrix(user_ids, track_ids, interaction_types):
+    """
+    Sums the interaction weights of every (user, track) pair.
+    Returns (users, items, user x item CSR matrix of summed weights).
+    """
+    weights = np.array([INTERACTION_WEIGHTS.get(kind or "play", 1.0) for kind in interaction_types],
+                       dtype=np.float32)
+    user_codes, users = pd.factorize(pd.Series(user_ids, dtype=object))
+    item_codes, items = pd.factorize(pd.Series(track_ids, dtype=object))
+    matrix = sparse.csr_matrix((weights, (user_codes, item_codes)), shape=(len(users), len(items)))
+    matrix.sum_duplicates()
+    return np.asarray(users, dtype=object), np.asarray(items, dtype=object), matrix
+
+
+def _solve_rows(matrix, fixed, gram, out, start, stop, alpha, regularization):
+    """
+    Least-squares update of rows [start, stop) of `out` against the fixed side:
+    x_u = (Y'Y + Y_u'(C_u - I)Y_u + lambda*I)^-1 Y_u' C_u p_u
+    """
+    identity = regularization * np.eye(fixed.shape[1], dtype=np.float32)
+    for u in range(start, stop):
+        lo, hi = matrix.indptr[u], matrix.indptr[u + 1]
+        if lo == hi:
+            out[u] = 0
+            continue
+        y = fixed[matrix.indices[lo:hi]]
+        weights = matrix.data[lo:hi]
+        confidence = 1 + alpha * np.abs(weights)
+        preference = (weights > 0).astype(np.float32)
+        a = gram + (y.T * (confidence - 1)) @ y + identity
+        b = y.T @ (confidence * preference)
+        out[u] = np.linalg.solve(a, b)
+
+
+def train_als(matrix, factors: int = ALS_FACTORS, regularization: float = ALS_REGULARIZATION,
+              iterations: int = ALS_ITERATIONS, alpha: float = ALS_ALPHA,
+              workers: int = None, chunk_size: int = 256, seed: int = 42):
+    """
+    Implicit-feedback ALS (Hu, Koren & Volinsky) over a user x item matrix of
+    summed interaction weights. Each half-step solves every user (or item)
+    row independently, so chunks of rows run on a thread pool; numpy
+    releases the GIL inside the products and solves.
+    Returns (user_factors, item_factors) as float32 arrays.
+    """
+    rng = np.random.default_rng(seed)
+    matrix = matrix.tocsr().astype(np.float32)
+    matrix_t = matrix.T.tocsr()
+    user_factors = (rng.standard_normal((matrix.shape[0], factors)) * 0.01).astype(np.float32)
+    item_factors = (rng.standard_normal((matrix.shape[1], factors)) * 0.01).astype(np.float32)
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for iteration in range(iterations):
+            for rows, fixed, out in ((matrix, item_factors, user_factors), (matrix_t, user_factors, item_factors)):
+                gram = fixed.T @ fixed
+                jobs = [pool.submit(_solve_rows, rows, fixed, gram, out, start,
+                                    min(start + chunk_size, rows.shape[0]), alpha, regularization)
+                        for start in range(0, rows.shape[0], chunk_size)]
+                for job in jobs:
+                    job.result()
+            print(f"✅ Iteration {iteration + 1}/{iterations}")
+
+    return user_factors, item_factors
+
+
+def write_factors(data_dir: str, users, items, user_factors, item_factors):
+    # write to temp files first so running services never map half-written factors
+    files = [
+        (ALS_USER_FACTORS_FILE, lambda f: np.save(f, user_factors.astype(np.float32))),
+        (ALS_ITEM_FACTORS_FILE, lambda f: np.save(f, item_factors.astype(np.float32))),
+        (ALS_IDS_FILE, lambda f: np.savez(f, user_ids=np.asarray(users, dtype=np.int64),
+                                         track_ids=np.asarray(items, dtype=str))),
+    ]
+    for name, save in files:
+        path = os.path.join(data_dir, name)
+        with open(path + ".tmp", "wb") as f:
+            save(f)
+        os.replace(path + ".tmp", path)
+
+
+class FactorModel:
+    """
+    Read-only, memory-mapped user and item factors written by write_factors.
+
+    A user's predicted preference for every track is one product with the
+    item factors; users missing from the training data are folded in from
+    their recent history with a single least-squares solve.
+    """
+
+    def __init__(self, user_ids, track_ids, user_factors, item_factors):
+        self.user_factors = user_factors
+        self.item_factors = item_factors
+        self.track_ids = track_ids
+        self.user_index = {u: i for i, u in enumerate(user_ids.tolist())}
+        self.item_index = {t: i for i, t in enumerate(track_ids.tolist())}
+        self._gram = None
+
+    @classmethod
+    def open(cls, data_dir: str):
+        """Maps the factors, or returns None if they are missing or inconsistent."""
+        paths = [os.path.join(data_dir, name) for name in (ALS_IDS_FILE, ALS_USER_FACTORS_FILE, ALS_ITEM_FACTORS_FILE)]
+        if not all(os.path.exists(p) for p in paths):
+            return None
+        try:
+            with np.load(paths[0], allow_pickle=False) as ids:
+                user_ids, track_ids = ids["user_ids"], ids["track_ids"].astype(object)
+            user_factors = np.load(paths[1], mmap_mode="r")
+            item_factors = np.load(paths[2], mmap_mode="r")
+        except Exception as e:
+            print(f"⚠️  Could not load ALS factors from {data_dir}: {e}")
+            return None
+        if (len(user_ids), len(track_ids)) != (len(user_factors), len(item_factors)):
+            print(f"⚠️  ALS factors in {data_dir} don't match their ids; ignoring them.")
+            return None
+        return cls(user_ids, track_ids, user_factors, item_factors)
+
+    def _fold_in(self, history):
+        rows = [self.item_index[t] for t in dict.fromkeys(history) if t in self.item_index]
+        if not rows:
+            return None
+        if self._gram is None:
+            self._gram = self.item_factors.T @ self.item_factors
+        y = np.asarray(self.item_factors[rows])
+        factors = y.shape[1]
+        a = self._gram + ALS_ALPHA * (y.T @ y) + ALS_REGULARIZATION * np.eye(factors, dtype=np.float32)
+        return np.linalg.solve(a, y.sum(axis=0) * (1 + ALS_ALPHA))
+
+    def recommend(self, user_id, history: list, k: int, exclude=None):
+        """
+        Returns (track_ids, predicted preferences) of the k best tracks
+        outside `exclude` (default: `history`), best first. `history` only
+        folds in users the factors weren't trained on.
+        """
+        row = self.user_index.get(user_id)
+        vector = self.user_factors[row] if row is not None else self._fold_in(history)
+        if vector is None:
+            return [], np.zeros(0, dtype=np.float32)
+        scores = self.item_factors @ np.asarray(vector, dtype=np.float32)
+        played = [self.item_index[t] for t in (history if exclude is None else exclude) if t in self.item_index]
+        scores[played] = -np.inf
+        best = top_k(scores, min(k, len(scores) - len(set(played))))
+        return self.track_ids[best].tolist(), scores[best]
+
+    def stats(self):
+        return {
+            "users": len(self.user_index),
+            "tracks": len(self.item_index),
+            "factors": self.item_factors.shape[1],
+        }
@@ -25,6 +25,8 @@ app.add_middleware(
 # Initialize recommender
 # Ideally this should be a singleton or dependency injection
 recommender = Recommender()
+# the monolith serves every route, so build all the derived indexes up front
+recommender.warm_up("track_index", "search_index", "suggest_index", "vector_index", "genre_analytics")
 
 class Track(BaseModel):
     track_id: str
@@ -56,9 +58,14 @@ class RecommendationResponse(BaseModel):
 def read_root():
     return {"message": "Welcome to Spotify Music Intelligence Platform API"}
 
+@app.get("/api/v1/search/suggest")
+def suggest_tracks(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=50)):
+    suggestions = recommender.get_suggestions(q, limit)
+    return {"query": q, "suggestions": suggestions, "count": len(suggestions)}
+
 @app.get("/api/v1/search")
-def search_tracks(q: str = Query(..., min_length=1), limit: int = 20):
-    results = recommender.search_tracks(q, limit)
+def search_tracks(q: str = Query(..., min_length=1), limit: int = 20, fuzzy: bool = False):
+    results = recommender.search_tracks(q, limit, fuzzy=fuzzy)
     return {"results": results, "count": len(results)}
 
 @app.get("/api/v1/recommendations/{track_id}", response_model=RecommendationResponse)
@@ -75,7 +82,7 @@ def get_recommendations(track_id: str, limit: int = 20):
 
 @app.get("/api/v1/recommendations/mood/{mood_name}")
 def get_mood_recommendations(mood_name: str, limit: int = 20):
-    valid_moods = ['happy', 'sad', 'energetic', 'calm', 'focused', 'party', 'workout', 'chill']
+    valid_moods = recommender.get_moods()
     if mood_name.lower() not in valid_moods:
         raise HTTPException(status_code=400, detail=f"Invalid mood. Available moods: {', '.join(valid_moods)}")
         
@@ -187,6 +194,7 @@ def generate_playlist(
     seed_track_id: Optional[str] = None, 
     mood: Optional[str] = None, 
     limit: int = 20,
+    smooth_transitions: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -196,7 +204,7 @@ def generate_playlist(
     if seed_track_id:
         recommendations = recommender.get_recommendations(seed_track_id, limit)
     elif mood:
-        recommendations = recommender.get_recommendations_by_mood(mood, limit)
+        recommendations = recommender.get_recommendations_by_mood(mood, limit, smooth=smooth_transitions)
     else:
         raise HTTPException(status_code=400, detail="Must provide seed_track_id or mood")
     
@@ -362,8 +370,39 @@ def delete_preference_profile(
     return {"message": "Profile deleted"}
 
 # Analytics and History Routes
-from models import ListeningHistory, Track as TrackModel
+from models import ListeningHistory, TasteProfile, Track as TrackModel
 from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from play_timeline import PlayTimeline
+
+# Monthly per-genre play counts, fed incrementally from listening history
+play_timeline = PlayTimeline(recommender.get_track_genres)
+
+def refresh_play_timeline(db: Session):
+    """Counts the listening history committed since the last refresh."""
+    rows = db.query(ListeningHistory.id, ListeningHistory.track_id, ListeningHistory.played_at).filter(
+        ListeningHistory.id > play_timeline.since()
+    ).order_by(ListeningHistory.id).all()
+    play_timeline.add(rows)
+
+def record_taste(db: Session, user_id: int, track_id: str):
+    """Folds a played track into the user's taste profile in O(1); the caller commits."""
+    profile = db.query(TasteProfile).filter(TasteProfile.user_id == user_id).with_for_update().first()
+    if profile is None:
+        if recommender.update_taste_profile(None, 0.0, track_id) is None:
+            return
+        # FOR UPDATE can't lock a row that doesn't exist yet, so two first plays
+        # race to create it: insert it unless it is there, then lock the winner
+        insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+        db.execute(insert(TasteProfile).values(user_id=user_id, total_weight=0.0, plays=0)
+                   .on_conflict_do_nothing(index_elements=["user_id"]))
+        profile = db.query(TasteProfile).filter(TasteProfile.user_id == user_id).with_for_update().one()
+    updated = recommender.update_taste_profile(profile.weighted_sum, profile.total_weight, track_id)
+    if updated is None:
+        return
+    profile.weighted_sum, profile.total_weight = updated
+    profile.plays += 1
 
 @app.post("/api/v1/history")
 def record_listening_history(
@@ -381,6 +420,7 @@ def record_listening_history(
         track_id=track_id
     )
     db.add(history_entry)
+    record_taste(db, current_user.id, track_id)
     db.commit()
     return {"message": "Listening event recorded"}
 
@@ -396,39 +436,43 @@ def get_analytics_summary(
         return {
             "total_plays": 0,
             "top_genres": [],
-            "average_features": {}
+            "average_features": {},
+            "taste_profile": None
         }
         
-    # Get all tracks played by user to calculate averages
-    # Join with Track to get features
-    history_tracks = db.query(TrackModel).join(
-        ListeningHistory, TrackModel.track_id == ListeningHistory.track_id
-    ).filter(ListeningHistory.user_id == current_user.id).all()
-    
-    # Calculate average features
+    # Lifetime averages stay an exact aggregate over the whole history: the taste
+    # profile below is recency-weighted, min-max scaled and only covers plays
+    # recorded since it was introduced, so it can't stand in for them. The
+    # database computes both aggregates, so no history rows are loaded here.
     features = ['danceability', 'energy', 'valence', 'acousticness', 'instrumentalness', 'speechiness', 'tempo']
-    averages = {}
-    for f in features:
-        averages[f] = sum(getattr(t, f) for t in history_tracks) / len(history_tracks)
+    row = db.query(*[func.avg(getattr(TrackModel, f)) for f in features]).select_from(TrackModel).join(
+        ListeningHistory, TrackModel.track_id == ListeningHistory.track_id
+    ).filter(ListeningHistory.user_id == current_user.id).one()
+    averages = dict(zip(features, row))
         
     # Top Genres (simple count)
-    genre_counts = {}
-    for t in history_tracks:
-        genre = t.track_genre
-        if genre:
-            genre_counts[genre] = genre_counts.get(genre, 0) + 1
-            
-    top_genres = sorted(genre_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+    plays = func.count(ListeningHistory.id)
+    top_genres = db.query(TrackModel.track_genre, plays).select_from(TrackModel).join(
+        ListeningHistory, TrackModel.track_id == ListeningHistory.track_id
+    ).filter(
+        ListeningHistory.user_id == current_user.id, TrackModel.track_genre.isnot(None), TrackModel.track_genre != ""
+    ).group_by(TrackModel.track_genre).order_by(plays.desc()).limit(5).all()
+
+    # Recency-weighted scaled features, maintained as events are recorded
+    profile = db.query(TasteProfile).filter(TasteProfile.user_id == current_user.id).first()
+    taste = recommender.get_taste_features(profile.weighted_sum, profile.total_weight) if profile else None
     
     return {
         "total_plays": history_count,
         "top_genres": [{"genre": g, "count": c} for g, c in top_genres],
-        "average_features": averages
+        "average_features": averages,
+        "taste_profile": taste
     }
 
 class WorkoutPlaylistRequest(BaseModel):
     duration_minutes: int = 30
     intensity: str = "medium" # low, medium, high
+    smooth_transitions: bool = False # order each phase to minimise tempo, key and energy jumps
 
 @app.post("/api/v1/playlists/workout")
 def generate_workout_playlist(
@@ -436,7 +480,7 @@ def generate_workout_playlist(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    tracks = recommender.get_workout_playlist(req.duration_minutes, req.intensity)
+    tracks = recommender.get_workout_playlist(req.duration_minutes, req.intensity, smooth=req.smooth_transitions)
     
     if not tracks:
         raise HTTPException(status_code=404, detail="Could not find suitable tracks for your workout criteria.")
@@ -448,6 +492,14 @@ def generate_workout_playlist(
         "tracks": tracks
     }
 
+@app.get("/api/v1/genres/analytics")
+def get_all_genre_analytics(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    analytics = recommender.get_all_genre_analytics()
+    return {"genres": analytics, "count": len(analytics)}
+
 @app.get("/api/v1/genres/{genre}/analytics")
 def get_genre_analytics(
     genre: str,
@@ -464,7 +516,8 @@ def get_global_trends(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return recommender.get_trend_analysis()
+    refresh_play_timeline(db)
+    return recommender.get_trend_analysis(play_timeline.snapshot())
 
 from classifier import GenreClassifier
 classifier = GenreClassifier()
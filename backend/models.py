@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, Table, DateTime
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, Table, DateTime, JSON
 from sqlalchemy.orm import relationship
 from database import Base
 import datetime
@@ -81,7 +81,7 @@ class ListeningHistory(Base):
     __tablename__ = "listening_history"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     track_id = Column(String, ForeignKey("tracks.track_id"))
     played_at = Column(DateTime, default=datetime.datetime.utcnow)
     
@@ -91,6 +91,18 @@ class ListeningHistory(Base):
     owner = relationship("User", back_populates="listening_history")
     track = relationship("Track")
 
+class TasteProfile(Base):
+    __tablename__ = "taste_profiles"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+
+    # Recency-decayed running mean of the scaled features of played tracks,
+    # stored as weighted_sum / total_weight (see taste_profile.py)
+    weighted_sum = Column(JSON)
+    total_weight = Column(Float, default=0.0)
+    plays = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
 # Update User model to include listening_history
 # (Already updated in User class below)
 
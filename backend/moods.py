@@ -0,0 +1,52 @@
+import json
+import os
+import numpy as np
+
+# Mood profiles: every track matching all of a mood's (column, operator, value)
+# conditions belongs to that mood. A moods.json file in the data directory with
+# the same shape, e.g. {"rainy": [["valence", "<", 0.4], ["acousticness", ">", 0.6]]},
+# adds moods or overrides these without code changes.
+DEFAULT_MOODS = {
+    # High valence (positive), High energy
+    "happy": [("valence", ">", 0.6), ("energy", ">", 0.6)],
+    # Low valence (negative), Low energy
+    "sad": [("valence", "<", 0.4), ("energy", "<", 0.4)],
+    # High energy, High danceability
+    "energetic": [("energy", ">", 0.7), ("danceability", ">", 0.6)],
+    # Low energy, High acousticness
+    "calm": [("energy", "<", 0.4), ("acousticness", ">", 0.5)],
+    # High instrumentalness, Low speechiness
+    "focused": [("instrumentalness", ">", 0.5), ("speechiness", "<", 0.3)],
+    # High danceability, High energy, High valence
+    "party": [("danceability", ">", 0.7), ("energy", ">", 0.7), ("valence", ">", 0.6)],
+    # Highest energy, High tempo (> 120 bpm)
+    "workout": [("energy", ">", 0.8), ("tempo", ">", 120)],
+    # Low energy, High acousticness
+    "chill": [("energy", "<", 0.5), ("acousticness", ">", 0.4)],
+}
+
+MOOD_OPERATORS = {
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    "==": np.equal,
+}
+
+
+def load_moods(path: str = None):
+    """Built-in moods merged with the ones defined in `path`, if it exists."""
+    moods = {name: list(conditions) for name, conditions in DEFAULT_MOODS.items()}
+    if path and os.path.exists(path):
+        try:
+            with open(path) as f:
+                custom = json.load(f)
+            for name, conditions in custom.items():
+                parsed = [(col, op, float(value)) for col, op, value in conditions]
+                unknown = [op for _, op, _ in parsed if op not in MOOD_OPERATORS]
+                if unknown:
+                    raise ValueError(f"mood '{name}' uses unsupported operators {unknown}")
+                moods[name.lower()] = parsed
+        except Exception as e:
+            print(f"⚠️  Could not load moods from {path}: {e}")
+    return moods
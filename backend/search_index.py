@@ -0,0 +1,435 @@
+import bisect
+import os
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
+
+SEARCH_INDEX_FILE = "search_index.npz"
+SUGGEST_INDEX_FILE = "suggest_index.npz"
+
+# relevance of a query token matching a word in each field; a whole-word match
+# counts double compared to a match on a word's prefix
+FIELD_WEIGHTS = {"track_name": 3, "artists": 2, "album_name": 1}
+EXACT_BOOST = 2
+# fuzzy mode verifies at most this many trigram candidates per query word,
+# which bounds its latency regardless of catalog size
+FUZZY_MAX_CANDIDATES = int(os.getenv("FUZZY_MAX_CANDIDATES", "500"))
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def normalize_text(text: str):
+    """Lower-cases `text` and strips accents, so 'Beyoncé' and 'beyonce' match."""
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text: str):
+    return _TOKEN_RE.findall(normalize_text(text))
+
+
+def word_trigrams(word: str):
+    """Distinct trigrams of `word` padded with '$', e.g. 'abc' -> {'$ab', 'abc', 'bc$'}."""
+    padded = f"${word}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_edits(word: str):
+    """
+    Typos tolerated in a query word of this length. An edit changes at most
+    three of a word's trigrams, so this keeps at least one shared trigram for
+    candidate generation: short words must match exactly.
+    """
+    if len(word) >= 7:
+        return 2
+    if len(word) >= 4:
+        return 1
+    return 0
+
+
+def edit_distances(word: str, candidates: list):
+    """Levenshtein distance from `word` to each of `candidates`, computed for all of them at once."""
+    if not candidates:
+        return np.zeros(0, dtype=np.int64)
+    # fixed-width unicode array viewed as code points, zero-padded past each word's end
+    chars = np.array(candidates)
+    width = chars.dtype.itemsize // 4
+    chars = chars.view(np.uint32).reshape(len(candidates), width)
+    lengths = np.count_nonzero(chars, axis=1)
+
+    previous = np.tile(np.arange(width + 1), (len(candidates), 1))
+    for i, c in enumerate(word, 1):
+        # substitution and deletion are independent per column; insertion runs left to right
+        best = np.minimum(previous[:, :-1] + (chars != ord(c)), previous[:, 1:] + 1)
+        current = np.empty_like(previous)
+        current[:, 0] = i
+        for j in range(width):
+            current[:, j + 1] = np.minimum(best[:, j], current[:, j] + 1)
+        previous = current
+    return previous[np.arange(len(candidates)), lengths]
+
+
+def save_npz(path: str, **arrays):
+    """
+    np.savez to a per-process temp file renamed into place: the services
+    sharing the data dir all save at boot, and none may load a partial file.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def pack_strings(values):
+    """
+    Encodes strings as one NUL-separated UTF-8 byte array, like the catalog's
+    string tables, plus a mask of the entries that were missing (None/NaN).
+    """
+    missing = np.array([not isinstance(v, str) for v in values], dtype=bool)
+    blob = "\0".join(v if isinstance(v, str) else "" for v in values).encode("utf-8")
+    return np.frombuffer(blob, dtype=np.uint8), missing
+
+
+def unpack_strings(blob, missing=None):
+    """Inverse of pack_strings; missing entries come back as None."""
+    text = blob.tobytes().decode("utf-8")
+    values = text.split("\0") if text or (missing is not None and len(missing)) else []
+    if missing is not None and missing.any():
+        values = [None if gone else v for v, gone in zip(values, missing.tolist())]
+    return values
+
+
+def _field_postings(values, weight: int):
+    """(term, row, weight) for every distinct word of every value in one column."""
+    # tokenize each distinct value once; names and artists repeat a lot
+    codes, uniques = pd.factorize(pd.Series(values))
+    token_lists = pd.Series([sorted(set(tokenize(v))) for v in uniques], dtype=object)
+    per_row = token_lists.take(codes[codes >= 0])
+    per_row.index = np.flatnonzero(codes >= 0)
+    terms = per_row.explode().dropna()
+    return pd.DataFrame({"term": terms.to_numpy(dtype=object), "row": terms.index.to_numpy(np.int64), "weight": weight})
+
+
+class SearchIndex:
+    """
+    Inverted index over the words of track names, artists and album names.
+
+    The vocabulary is kept sorted and every term's posting list (row positions
+    with the summed weight of the fields it occurs in) is stored contiguously,
+    so all words starting with a prefix form one range of `terms` and their
+    postings one slice of `rows`/`weights`. A query therefore touches only the
+    postings of the words it matches, never the whole catalog.
+
+    For fuzzy queries a second, trigram -> word posting list over the
+    vocabulary proposes candidate words, which are verified with a bounded
+    edit distance before their postings are read. The same postings find the
+    words containing a query word that no word starts with, e.g. part of an
+    unspaced CJK title, which is a single word.
+    """
+
+    def __init__(self, terms, offsets, rows, weights, popularity, trigrams=None):
+        self.terms = terms
+        self.offsets = offsets
+        self.rows = rows
+        self.weights = weights
+        self.popularity = popularity
+        if trigrams is None:
+            trigrams = self._build_trigrams(terms)
+        # trigram list, its postings' offsets, word ids per posting, word lengths
+        self.trigrams, self.trigram_offsets, self.trigram_terms, self.term_lengths = trigrams
+        self.trigram_ids = {gram: i for i, gram in enumerate(self.trigrams)}
+
+    @staticmethod
+    def _build_trigrams(terms):
+        term_lengths = np.fromiter((len(t) for t in terms), dtype=np.int32, count=len(terms))
+        grams, term_ids = [], []
+        for term_id, term in enumerate(terms):
+            for gram in word_trigrams(term):
+                grams.append(gram)
+                term_ids.append(term_id)
+        codes, uniques = pd.factorize(pd.Series(grams, dtype=object))
+        order = np.argsort(codes, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(uniques)))]).astype(np.int64)
+        return [str(g) for g in uniques], offsets, np.asarray(term_ids, dtype=np.int32)[order], term_lengths
+
+    @classmethod
+    def build(cls, df):
+        frames = [_field_postings(df[col], weight) for col, weight in FIELD_WEIGHTS.items() if col in df.columns]
+        if frames:
+            postings = pd.concat(frames, ignore_index=True).groupby(["term", "row"], sort=True)["weight"].sum()
+            rows = postings.index.get_level_values("row").to_numpy(np.int32)
+            weights = postings.to_numpy(np.int8)
+            # postings are sorted by term, so first-appearance order is the sorted vocabulary
+            codes, vocab = pd.factorize(postings.index.get_level_values("term"))
+            counts = np.bincount(codes, minlength=len(vocab))
+        else:
+            rows = np.zeros(0, dtype=np.int32)
+            weights = np.zeros(0, dtype=np.int8)
+            vocab, counts = np.zeros(0, dtype=object), np.zeros(0, dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return cls([str(t) for t in vocab], offsets, rows, weights, cls._popularity(df))
+
+    @staticmethod
+    def _popularity(df):
+        if "popularity" in df.columns:
+            return df["popularity"].fillna(0).to_numpy(np.float32)
+        return np.zeros(len(df), dtype=np.float32)
+
+    def save(self, path: str, version: str):
+        save_npz(path, terms=pack_strings(self.terms)[0],
+                 offsets=self.offsets, rows=self.rows, weights=self.weights,
+                 trigrams=pack_strings(self.trigrams)[0], trigram_offsets=self.trigram_offsets,
+                 trigram_terms=self.trigram_terms, term_lengths=self.term_lengths,
+                 version=np.array(version))
+
+    @classmethod
+    def load(cls, path: str, df, version: str):
+        """Loads a persisted index, or returns None if it was built for another dataset."""
+        with np.load(path) as data:
+            if str(data["version"]) != version or "trigrams" not in data:
+                return None
+            trigrams = (unpack_strings(data["trigrams"]), data["trigram_offsets"],
+                        data["trigram_terms"], data["term_lengths"])
+            return cls(unpack_strings(data["terms"]), data["offsets"], data["rows"], data["weights"],
+                       cls._popularity(df), trigrams)
+
+    def term_range(self, prefix: str):
+        """Positions [lo, hi) of the vocabulary words starting with `prefix`."""
+        lo = bisect.bisect_left(self.terms, prefix)
+        hi = bisect.bisect_left(self.terms, prefix + "\U0010ffff", lo)
+        return lo, hi
+
+    def fuzzy_terms(self, token: str):
+        """Vocabulary positions of the words within max_edits(token) edits of `token`."""
+        max_dist = max_edits(token)
+        if max_dist == 0:
+            return []
+        grams = [self.trigram_ids[g] for g in word_trigrams(token) if g in self.trigram_ids]
+        # q-gram lemma: a word within max_dist edits shares at least this many trigrams
+        needed = len(word_trigrams(token)) - 3 * max_dist
+        if not grams or needed > len(grams):
+            return []
+        candidates = np.concatenate([self.trigram_terms[self.trigram_offsets[g]:self.trigram_offsets[g + 1]] for g in grams])
+        candidates, shared = np.unique(candidates, return_counts=True)
+        keep = (shared >= max(needed, 1)) & (np.abs(self.term_lengths[candidates] - len(token)) <= max_dist)
+        candidates, shared = candidates[keep], shared[keep]
+        if len(candidates) > FUZZY_MAX_CANDIDATES:
+            candidates = candidates[np.argsort(-shared, kind="stable")[:FUZZY_MAX_CANDIDATES]]
+        distances = edit_distances(token, [self.terms[t] for t in candidates])
+        return candidates[distances <= max_dist].tolist()
+
+    def infix_terms(self, token: str):
+        """Vocabulary positions of the words containing `token`."""
+        if len(token) >= 3:
+            # every trigram of the token is a trigram of a word containing it
+            grams = [self.trigram_ids.get(token[i:i + 3]) for i in range(len(token) - 2)]
+            if None in grams:
+                return []
+            lists = sorted((self.trigram_terms[self.trigram_offsets[g]:self.trigram_offsets[g + 1]] for g in grams), key=len)
+            candidates = lists[0]
+            for other in lists[1:]:
+                candidates = np.intersect1d(candidates, other)
+        else:
+            # shorter tokens sit inside one of the word's '$'-padded trigrams
+            grams = [i for i, gram in enumerate(self.trigrams) if token in gram]
+            if not grams:
+                return []
+            candidates = np.unique(np.concatenate([self.trigram_terms[self.trigram_offsets[g]:self.trigram_offsets[g + 1]] for g in grams]))
+        return [t for t in candidates.tolist() if token in self.terms[t]]
+
+    def _match(self, token: str, fuzzy: bool = False):
+        """
+        Rows containing a word that starts with `token` (or, failing that, a
+        word containing it; or, when fuzzy, a word a few edits away from it),
+        with their best score.
+        """
+        lo, hi = self.term_range(token)
+        start, end = self.offsets[lo], self.offsets[hi]
+        rows = self.rows[start:end]
+        scores = self.weights[start:end].astype(np.int32)
+        if lo < hi and self.terms[lo] == token:
+            # the exact word sorts first in its prefix range
+            scores[:self.offsets[lo + 1] - start] *= EXACT_BOOST
+        merged = hi - lo > 1
+        # infix and near-miss words score like prefix matches
+        more = self.infix_terms(token) if lo == hi else []
+        if fuzzy:
+            # words already in the prefix range are skipped
+            more += [t for t in self.fuzzy_terms(token) if not lo <= t < hi]
+        more = list(dict.fromkeys(more))
+        if more:
+            rows = np.concatenate([rows] + [self.rows[self.offsets[t]:self.offsets[t + 1]] for t in more])
+            scores = np.concatenate([scores] + [self.weights[self.offsets[t]:self.offsets[t + 1]].astype(np.int32) for t in more])
+            merged = True
+        if merged:
+            # a row can match several words with this prefix; keep its best score
+            order = np.lexsort((-scores, rows))
+            rows, scores = rows[order], scores[order]
+            first = np.ones(len(rows), dtype=bool)
+            first[1:] = rows[1:] != rows[:-1]
+            rows, scores = rows[first], scores[first]
+        return rows, scores
+
+    def search(self, query: str, limit: int = 20, fuzzy: bool = False):
+        """
+        Row positions of the tracks matching every word of `query` (as a whole
+        word or a word prefix, else inside a word, or with a few typos when
+        `fuzzy`), best match first and more popular tracks first among equally
+        relevant ones.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return np.zeros(0, dtype=np.int64)
+
+        matches = sorted((self._match(t, fuzzy) for t in tokens), key=lambda m: len(m[0]))
+        rows, scores = matches[0]
+        for other_rows, other_scores in matches[1:]:
+            if len(rows) == 0:
+                break
+            rows, mine, theirs = np.intersect1d(rows, other_rows, assume_unique=True, return_indices=True)
+            scores = scores[mine] + other_scores[theirs]
+
+        order = np.lexsort((rows, -self.popularity[rows], -scores))[:limit]
+        return rows[order].astype(np.int64)
+
+
+def normalize_phrase(text: str):
+    """Normalised words of `text` joined by single spaces, so punctuation and spacing don't matter."""
+    return " ".join(tokenize(text))
+
+
+SUGGEST_TRACK = 0
+SUGGEST_ARTIST = 1
+
+
+class SuggestIndex:
+    """
+    Sorted array of normalised track names and artist names for autocomplete.
+
+    Every distinct name appears once, carrying the most popular track (or the
+    artist's best popularity) and that track's id and artists, so answering
+    needs no catalog lookups. Completions of a prefix are a contiguous range
+    of `keys`, so a lookup is two binary searches plus a top-N partial sort of
+    that range's popularity.
+    """
+
+    def __init__(self, keys, kinds, popularity, labels, track_ids, artists):
+        self.keys = keys
+        self.kinds = kinds
+        self.popularity = popularity
+        self.labels = labels
+        self.track_ids = track_ids
+        self.artists = artists
+
+    @classmethod
+    def build(cls, df):
+        frames = []
+        popularity = SearchIndex._popularity(df)
+        if "track_name" in df.columns:
+            frames.append(pd.DataFrame({
+                "label": df["track_name"].to_numpy(dtype=object),
+                "row": np.arange(len(df)),
+                "kind": SUGGEST_TRACK,
+            }))
+        if "artists" in df.columns:
+            # multiple artists are separated by ';'
+            artists = pd.Series(df["artists"].to_numpy(dtype=object)).str.split(";").explode()
+            frames.append(pd.DataFrame({
+                "label": artists.str.strip().to_numpy(dtype=object),
+                "row": artists.index.to_numpy(np.int64),
+                "kind": SUGGEST_ARTIST,
+            }))
+        if not frames:
+            return cls([], np.zeros(0, np.int8), np.zeros(0, np.float32), [], [], [])
+
+        entries = pd.concat(frames, ignore_index=True).dropna(subset=["label"])
+        codes, uniques = pd.factorize(entries["label"])
+        entries["key"] = np.array([normalize_phrase(v) for v in uniques], dtype=object)[codes]
+        entries = entries[entries["key"] != ""]
+        entries["popularity"] = popularity[entries["row"].to_numpy()]
+        # keep the most popular entry per (kind, name), then order by name
+        entries = entries.sort_values("popularity", ascending=False, kind="stable")
+        entries = entries.drop_duplicates(["kind", "key"]).sort_values(["key", "kind"], kind="stable")
+        rows = entries["row"].to_numpy()
+        return cls(
+            entries["key"].tolist(),
+            entries["kind"].to_numpy(np.int8),
+            entries["popularity"].to_numpy(np.float32),
+            entries["label"].tolist(),
+            df["track_id"].to_numpy(dtype=object)[rows].tolist() if "track_id" in df.columns else [None] * len(rows),
+            df["artists"].to_numpy(dtype=object)[rows].tolist() if "artists" in df.columns else [None] * len(rows),
+        )
+
+    def save(self, path: str, version: str):
+        strings = {name: pack_strings(values) for name, values in
+                   (("keys", self.keys), ("labels", self.labels), ("track_ids", self.track_ids), ("artists", self.artists))}
+        save_npz(path, kinds=self.kinds, popularity=self.popularity, version=np.array(version),
+                 **{name: blob for name, (blob, _) in strings.items()},
+                 **{f"{name}_missing": missing for name, (_, missing) in strings.items()})
+
+    @classmethod
+    def load(cls, path: str, version: str):
+        """Loads a persisted index, or returns None if it was built for another dataset."""
+        with np.load(path) as data:
+            if str(data["version"]) != version:
+                return None
+            strings = {name: unpack_strings(data[name], data[f"{name}_missing"])
+                       for name in ("keys", "labels", "track_ids", "artists")}
+            return cls(strings["keys"], data["kinds"], data["popularity"], strings["labels"],
+                       strings["track_ids"], strings["artists"])
+
+    def suggest(self, prefix: str, limit: int = 10):
+        """Positions of the `limit` most popular names starting with `prefix`."""
+        prefix = normalize_phrase(prefix)
+        if not prefix or limit <= 0:
+            return np.zeros(0, dtype=np.int64)
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + "\U0010ffff", lo)
+        popularity = self.popularity[lo:hi]
+        if len(popularity) > limit:
+            candidates = np.argpartition(-popularity, limit - 1)[:limit]
+        else:
+            candidates = np.arange(len(popularity))
+        # most popular first; ties keep alphabetical order
+        order = candidates[np.lexsort((candidates, -popularity[candidates]))]
+        return order + lo
+
+
+def _load_or_build(path: str, load, build, version: str, name: str):
+    """
+    Loads an index persisted at `path` for this dataset version, or builds
+    it and persists it there.
+    """
+    if version is not None and os.path.exists(path):
+        try:
+            index = load(path)
+            if index is not None:
+                return index
+        except Exception as e:
+            print(f"⚠️  Could not load {name} from {path}: {e}")
+
+    index = build()
+    if version is not None:
+        try:
+            index.save(path, version)
+        except OSError as e:
+            print(f"⚠️  Could not persist {name} to {path}: {e}")
+    return index
+
+
+def build_search_index(df, data_dir: str, version: str):
+    """
+    Loads the search index persisted in `data_dir` for this dataset version,
+    or builds it from `df` and persists it there.
+    """
+    return _load_or_build(os.path.join(data_dir, SEARCH_INDEX_FILE),
+                          lambda path: SearchIndex.load(path, df, version),
+                          lambda: SearchIndex.build(df), version, "search index")
+
+
+def build_suggest_index(df, data_dir: str, version: str):
+    """Same as build_search_index, for the autocomplete index."""
+    return _load_or_build(os.path.join(data_dir, SUGGEST_INDEX_FILE),
+                          lambda path: SuggestIndex.load(path, version),
+                          lambda: SuggestIndex.build(df), version, "suggest index")
@@ -1,6 +1,9 @@
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 import sys
 import os
 
@@ -9,13 +12,15 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from shared.database import get_db
-from shared.models import User, ListeningHistory, Track as TrackModel
+from shared.models import User, ListeningHistory, TasteProfile, Track as TrackModel
 from shared.auth import get_current_user
 # We need Recommender for trend analysis logic
 try:
     from recommender_service.recommender import Recommender
+    from recommender_service.play_timeline import PlayTimeline
 except ImportError:
     from .recommender import Recommender # Fallback if copied locally
+    from .play_timeline import PlayTimeline
 
 app = FastAPI(title="Spotify Music Intelligence - Analytics Service", version="1.0")
 
@@ -33,6 +38,34 @@ Base.metadata.create_all(bind=engine)
 
 recommender = Recommender()
 
+# Monthly per-genre play counts, fed incrementally from listening history
+play_timeline = PlayTimeline(recommender.get_track_genres)
+
+def refresh_play_timeline(db: Session):
+    """Counts the listening history committed since the last refresh."""
+    rows = db.query(ListeningHistory.id, ListeningHistory.track_id, ListeningHistory.played_at).filter(
+        ListeningHistory.id > play_timeline.since()
+    ).order_by(ListeningHistory.id).all()
+    play_timeline.add(rows)
+
+def record_taste(db: Session, user_id: int, track_id: str):
+    """Folds a played track into the user's taste profile in O(1); the caller commits."""
+    profile = db.query(TasteProfile).filter(TasteProfile.user_id == user_id).with_for_update().first()
+    if profile is None:
+        if recommender.update_taste_profile(None, 0.0, track_id) is None:
+            return
+        # FOR UPDATE can't lock a row that doesn't exist yet, so two first plays
+        # race to create it: insert it unless it is there, then lock the winner
+        insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+        db.execute(insert(TasteProfile).values(user_id=user_id, total_weight=0.0, plays=0)
+                   .on_conflict_do_nothing(index_elements=["user_id"]))
+        profile = db.query(TasteProfile).filter(TasteProfile.user_id == user_id).with_for_update().one()
+    updated = recommender.update_taste_profile(profile.weighted_sum, profile.total_weight, track_id)
+    if updated is None:
+        return
+    profile.weighted_sum, profile.total_weight = updated
+    profile.plays += 1
+
 @app.post("/api/v1/history")
 def record_listening_history(
     track_id: str,
@@ -44,6 +77,7 @@ def record_listening_history(
         track_id=track_id
     )
     db.add(history_entry)
+    record_taste(db, current_user.id, track_id)
     db.commit()
     return {"message": "Listening event recorded"}
 
@@ -55,24 +89,34 @@ def get_analytics_summary(
     # Logic moved from monolithic main.py
     history_count = db.query(ListeningHistory).filter(ListeningHistory.user_id == current_user.id).count()
     if history_count == 0:
-        return {"total_plays": 0, "top_genres": [], "average_features": {}}
+        return {"total_plays": 0, "top_genres": [], "average_features": {}, "taste_profile": None}
         
-    history_tracks = db.query(TrackModel).join(
-        ListeningHistory, TrackModel.track_id == ListeningHistory.track_id
-    ).filter(ListeningHistory.user_id == current_user.id).all()
-    
+    # Lifetime averages stay an exact aggregate over the whole history: the taste
+    # profile below is recency-weighted, min-max scaled and only covers plays
+    # recorded since it was introduced, so it can't stand in for them. The
+    # database computes both aggregates, so no history rows are loaded here.
     features = ['danceability', 'energy', 'valence', 'acousticness', 'instrumentalness', 'speechiness', 'tempo']
-    averages = {f: sum(getattr(t, f) for t in history_tracks) / len(history_tracks) for f in features}
-        
-    genre_counts = {}
-    for t in history_tracks:
-        genre_counts[t.track_genre] = genre_counts.get(t.track_genre, 0) + 1
-    top_genres = sorted(genre_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+    row = db.query(*[func.avg(getattr(TrackModel, f)) for f in features]).select_from(TrackModel).join(
+        ListeningHistory, TrackModel.track_id == ListeningHistory.track_id
+    ).filter(ListeningHistory.user_id == current_user.id).one()
+    averages = dict(zip(features, row))
+
+    plays = func.count(ListeningHistory.id)
+    top_genres = db.query(TrackModel.track_genre, plays).select_from(TrackModel).join(
+        ListeningHistory, TrackModel.track_id == ListeningHistory.track_id
+    ).filter(ListeningHistory.user_id == current_user.id).group_by(
+        TrackModel.track_genre
+    ).order_by(plays.desc()).limit(5).all()
+
+    # Recency-weighted scaled features, maintained as events are recorded
+    profile = db.query(TasteProfile).filter(TasteProfile.user_id == current_user.id).first()
+    taste = recommender.get_taste_features(profile.weighted_sum, profile.total_weight) if profile else None
     
     return {
         "total_plays": history_count,
         "top_genres": [{"genre": g, "count": c} for g, c in top_genres],
-        "average_features": averages
+        "average_features": averages,
+        "taste_profile": taste
     }
 
 @app.get("/api/v1/analytics/trends")
@@ -80,7 +124,13 @@ def get_global_trends(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return recommender.get_trend_analysis()
+    refresh_play_timeline(db)
+    return recommender.get_trend_analysis(play_timeline.snapshot())
+
+@app.get("/api/v1/genres/analytics")
+def get_all_genre_analytics():
+    analytics = recommender.get_all_genre_analytics()
+    return {"genres": analytics, "count": len(analytics)}
 
 @app.get("/api/v1/genres/{genre}/analytics")
 def get_genre_analytics(genre: str):
@@ -41,6 +41,8 @@ class CustomPlaylistRequest(BaseModel):
 class WorkoutPlaylistRequest(BaseModel):
     duration_minutes: int = 30
     intensity: str = "medium"
+    # order each phase to minimise tempo, key and energy jumps
+    smooth_transitions: bool = False
 
 @app.post("/api/v1/playlists/generate")
 def generate_playlist(
@@ -48,13 +50,14 @@ def generate_playlist(
     seed_track_id: Optional[str] = None, 
     mood: Optional[str] = None, 
     limit: int = 20,
+    smooth_transitions: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     if seed_track_id:
         recommendations = recommender.get_recommendations(seed_track_id, limit)
     elif mood:
-        recommendations = recommender.get_recommendations_by_mood(mood, limit)
+        recommendations = recommender.get_recommendations_by_mood(mood, limit, smooth=smooth_transitions)
     else:
         raise HTTPException(status_code=400, detail="Must provide seed_track_id or mood")
     
@@ -73,7 +76,7 @@ def generate_playlist(
 
 @app.post("/api/v1/playlists/workout")
 def generate_workout_playlist(req: WorkoutPlaylistRequest):
-    tracks = recommender.get_workout_playlist(req.duration_minutes, req.intensity)
+    tracks = recommender.get_workout_playlist(req.duration_minutes, req.intensity, smooth=req.smooth_transitions)
     return {"name": f"My {req.intensity.capitalize()} workout", "tracks": tracks}
 
 @app.get("/api/v1/playlists")
@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+import numpy as np
+
+# seconds between polls for new listening events, and rows fetched per query
+INTERACTION_POLL_INTERVAL = float(os.getenv("INTERACTION_POLL_INTERVAL", "5"))
+INTERACTION_BATCH_SIZE = int(os.getenv("INTERACTION_BATCH_SIZE", "50000"))
+# ids below the newest one seen that every poll reads again: ids are handed
+# out at insert but rows become visible at commit, so a transaction that
+# commits after a higher id was read is still picked up if fewer than this
+# many ids were allocated in between
+INTERACTION_POLL_OVERLAP = int(os.getenv("INTERACTION_POLL_OVERLAP", "1000"))
+
+
+class InteractionStore:
+    """
+    Feeds new listening events to in-memory models as they are written.
+
+    `fetch_since(last_id, limit)` returns up to `limit` (id, user_id, track_id,
+    interaction_type) rows with id > last_id in id order. Each poll re-reads
+    the last `overlap` ids as well, to catch rows committed out of id order,
+    and drops the ids it already passed on, so every event is handed on once.
+    Events aren't kept: every fetched batch is handed to the listeners
+    registered with `add_listener`, which hold whatever state they need.
+    Reading starts after `last_id`, so listeners restored from a batch build
+    needn't replay the whole table.
+    """
+
+    def __init__(self, fetch_since, batch_size: int = INTERACTION_BATCH_SIZE, last_id: int = 0,
+                 overlap: int = INTERACTION_POLL_OVERLAP):
+        self.fetch_since = fetch_since
+        self.batch_size = batch_size
+        self.overlap = overlap
+        self.start_id = last_id
+        self.last_id = last_id
+        # ids inside the re-read window that were already handed on
+        self._seen = set()
+        self.late_events = 0
+        self.events_seen = 0
+        self._listeners = []
+        self._poll_lock = threading.Lock()
+        self._thread = None
+        self.last_poll = None
+
+    def add_listener(self, callback):
+        """callback(ids, user_ids, track_ids, interaction_types) for each new batch."""
+        self._listeners.append(callback)
+
+    def _dispatch(self, rows):
+        ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        users = np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows))
+        track_ids = [r[2] for r in rows]
+        interaction_types = [r[3] or "play" for r in rows]
+        self.late_events += int(np.count_nonzero(ids <= self.last_id))
+        self.last_id = max(self.last_id, int(ids[-1]))
+        self._seen.update(ids.tolist())
+        self.events_seen += len(rows)
+        for callback in self._listeners:
+            try:
+                callback(ids, users, track_ids, interaction_types)
+            except Exception as e:
+                print(f"⚠️  Interaction listener failed: {e}")
+
+    def poll(self):
+        """Fetches every event newer than the last one seen and passes it on; returns how many."""
+        added = 0
+        with self._poll_lock:
+            cursor = max(self.start_id, self.last_id - self.overlap)
+            while True:
+                rows = self.fetch_since(cursor, self.batch_size)
+                if not rows:
+                    break
+                cursor = rows[-1][0]
+                new = [r for r in rows if r[0] not in self._seen]
+                if new:
+                    self._dispatch(new)
+                    added += len(new)
+                if len(rows) < self.batch_size:
+                    break
+            floor = self.last_id - self.overlap
+            self._seen = {i for i in self._seen if i > floor}
+            self.last_poll = time.time()
+        return added
+
+    def start(self, interval: float = INTERACTION_POLL_INTERVAL):
+        """Reads the history now and keeps polling for new events on a daemon thread."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._poll_loop, args=(interval,),
+                                        name="interaction-poll", daemon=True)
+        self._thread.start()
+
+    def _poll_loop(self, interval):
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"⚠️  Polling listening history failed: {e}")
+            time.sleep(interval)
+
+    def stats(self):
+        return {
+            "events": self.events_seen,
+            "last_id": self.last_id,
+            "late_events": self.late_events,
+            "last_poll": self.last_poll,
+        }
@@ -0,0 +1,103 @@
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# Precomputed top-K neighbour graph, stored next to cleaned_dataset.csv.
+# Layout (little endian, fixed width so rows can be sliced straight off disk):
+#   64-byte header | int32 neighbour rows [n x k] | float32 scores [n x k]
+# Rows with fewer than k neighbours are padded with -1.
+KNN_GRAPH_FILE = "knn_graph.bin"
+MAGIC = b"KNNGRAPH"
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("n", "<i8"),
+    ("k", "<i4"),
+    ("reserved", "<i4"),
+    ("version", "S40"),
+])
+
+
+def build_knn_graph(unit, k: int, chunk_size: int = 128, workers: int = None):
+    """
+    Computes the k nearest neighbours (cosine, seed excluded) of every row of
+    the L2-normalised matrix `unit`. Chunks are scored in parallel threads;
+    numpy releases the GIL inside the matrix products and partitions.
+    """
+    n = len(unit)
+    k = min(k, max(n - 1, 0))
+    neighbours = np.full((n, k), -1, dtype=np.int32)
+    scores = np.zeros((n, k), dtype=np.float32)
+    if k == 0:
+        return neighbours, scores
+
+    def score_chunk(start):
+        stop = min(start + chunk_size, n)
+        sim = unit[start:stop] @ unit.T
+        # a track is not its own neighbour
+        sim[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+        part = np.argpartition(-sim, k - 1, axis=1)[:, :k]
+        vals = np.take_along_axis(sim, part, axis=1)
+        # best first, ties towards the higher row like the exact search
+        order = np.lexsort((-part, -vals), axis=-1)
+        neighbours[start:stop] = np.take_along_axis(part, order, axis=1)
+        scores[start:stop] = np.take_along_axis(vals, order, axis=1)
+        return stop
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for i, done in enumerate(pool.map(score_chunk, range(0, n, chunk_size))):
+            if i % 100 == 0:
+                print(f"✅ Processed {done}/{n} tracks...")
+
+    return neighbours, scores
+
+
+def write_knn_graph(path: str, neighbours, scores, version: str):
+    n, k = neighbours.shape
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header["magic"] = MAGIC
+    header["n"] = n
+    header["k"] = k
+    header["version"] = version.encode()
+
+    # write to a temp file first so running services never map a half-written graph
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        header.tofile(f)
+        neighbours.astype("<i4").tofile(f)
+        scores.astype("<f4").tofile(f)
+    os.replace(tmp_path, path)
+
+
+class KnnGraph:
+    """Read-only, memory-mapped view of a graph written by write_knn_graph."""
+
+    def __init__(self, neighbours, scores):
+        self.neighbours = neighbours
+        self.scores = scores
+        self.k = neighbours.shape[1]
+
+    @classmethod
+    def open(cls, path: str, version: str, n_rows: int):
+        """Maps the graph, or returns None if it is missing or built for another dataset."""
+        if not os.path.exists(path):
+            return None
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+        if len(header) == 0 or header["magic"][0] != MAGIC:
+            print(f"⚠️  {path} is not a neighbour graph file; ignoring it.")
+            return None
+        n, k = int(header["n"][0]), int(header["k"][0])
+        if header["version"][0].decode() != version or n != n_rows:
+            print(f"⚠️  {path} was built for another dataset version; ignoring it.")
+            return None
+
+        offset = HEADER_DTYPE.itemsize
+        neighbours = np.memmap(path, dtype="<i4", mode="r", offset=offset, shape=(n, k))
+        scores = np.memmap(path, dtype="<f4", mode="r", offset=offset + n * k * 4, shape=(n, k))
+        return cls(neighbours, scores)
+
+    def lookup(self, row: int, limit: int):
+        """Returns (neighbour rows, scores) of `row`, best first."""
+        neighbours = np.asarray(self.neighbours[row, :limit])
+        scores = np.asarray(self.scores[row, :limit])
+        keep = neighbours >= 0
+        return neighbours[keep].astype(np.int64), scores[keep]
@@ -16,8 +16,9 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from .recommender import Recommender
 from .classifier import GenreClassifier
+from .interaction_store import InteractionStore
 from shared.auth import get_current_user
-from shared.models import User, PreferenceProfile
+from shared.models import User, PreferenceProfile, TasteProfile
 
 app = FastAPI(title="Spotify Music Intelligence - Recommender Service", version="1.0")
 
@@ -30,12 +31,43 @@ app.add_middleware(
 )
 
 # Initialize Database
-from shared.database import engine, Base, get_db
+from shared.database import engine, Base, get_db, SessionLocal
+from shared.models import ListeningHistory
+from sqlalchemy import text
 Base.metadata.create_all(bind=engine)
+# create_all doesn't add indexes to a listening_history table that already
+# exists; the per-user history query needs this one
+with engine.begin() as conn:
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_listening_history_user_id ON listening_history (user_id)"))
 
 recommender = Recommender()
+# this service answers search and similarity queries: build their indexes now,
+# not on the first request; the other services build only what they query
+recommender.warm_up("track_index", "search_index", "suggest_index", "vector_index")
 classifier = GenreClassifier()
 
+# Most recent listening events of the requesting user fed to the recommender
+USER_HISTORY_LIMIT = int(os.getenv("USER_HISTORY_LIMIT", "200"))
+
+def fetch_listening_events(last_id: int, limit: int):
+    """Listening events newer than `last_id`, projected to what the interaction store keeps."""
+    db = SessionLocal()
+    try:
+        return db.query(
+            ListeningHistory.id, ListeningHistory.user_id,
+            ListeningHistory.track_id, ListeningHistory.interaction_type,
+        ).filter(ListeningHistory.id > last_id).order_by(ListeningHistory.id).limit(limit).all()
+    finally:
+        db.close()
+
+# poll the listening history for new rows only, starting shortly before the
+# co-occurrence build, and fold new events into the model as they arrive;
+# newer builds are picked up as they are written
+interaction_store = InteractionStore(fetch_listening_events, last_id=recommender.cooccurrence.replay_from())
+interaction_store.add_listener(recommender.cooccurrence.add_events)
+interaction_store.start()
+recommender.cooccurrence.start_reloading()
+
 class CustomFeatures(BaseModel):
     danceability: Optional[float] = 0.5
     energy: Optional[float] = 0.5
@@ -50,6 +82,14 @@ class CustomFeatures(BaseModel):
     tempo: Optional[float] = 120.0
     time_signature: Optional[int] = 4
 
+class BatchRecommendationRequest(BaseModel):
+    track_ids: List[str]
+    limit: int = 20
+    explain: bool = True
+
+# upper bound on seeds per batch request
+MAX_BATCH_SEEDS = 100
+
 class PreferenceProfileCreate(BaseModel):
     name: str
     danceability: float
@@ -60,21 +100,43 @@ class PreferenceProfileCreate(BaseModel):
     speechiness: float
     liveness: float
 
+@app.get("/api/v1/search/suggest")
+def suggest_tracks(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=50)):
+    suggestions = recommender.get_suggestions(q, limit)
+    return {"query": q, "suggestions": suggestions, "count": len(suggestions)}
+
 @app.get("/api/v1/search")
-def search_tracks(q: str = Query(..., min_length=1), limit: int = 20):
-    results = recommender.search_tracks(q, limit)
+def search_tracks(q: str = Query(..., min_length=1), limit: int = 20, fuzzy: bool = False):
+    results = recommender.search_tracks(q, limit, fuzzy=fuzzy)
     return {"results": results, "count": len(results)}
 
+@app.post("/api/v1/recommendations/batch")
+def get_batch_recommendations(req: BatchRecommendationRequest):
+    if not req.track_ids:
+        raise HTTPException(status_code=400, detail="Must provide at least one track ID")
+    if len(req.track_ids) > MAX_BATCH_SEEDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SEEDS} track IDs per request")
+    
+    batch = recommender.recommend_batch(req.track_ids, req.limit, req.explain)
+    missing = [tid for tid in dict.fromkeys(req.track_ids) if tid not in batch["results"]]
+    return {
+        "results": batch["results"],
+        "backends": batch["backends"],
+        "missing": missing,
+        "count": len(batch["results"])
+    }
+
 @app.get("/api/v1/recommendations/{track_id}")
-def get_recommendations(track_id: str, limit: int = 20):
+def get_recommendations(track_id: str, limit: int = 20, explain: bool = True):
     source_track = recommender.get_track_by_id(track_id)
     if not source_track:
         raise HTTPException(status_code=404, detail="Track not found")
     
-    recommendations = recommender.get_recommendations(track_id, limit)
+    result = recommender.recommend(track_id, limit, explain)
     return {
         "source_track": source_track,
-        "recommendations": recommendations
+        "recommendations": result["recommendations"],
+        "backend": result["backend"]
     }
 
 @app.get("/api/v1/recommendations/mood/{mood}")
@@ -86,23 +148,36 @@ def get_recommendations_by_mood(mood: str, limit: int = 20):
         "count": len(recommendations)
     }
 
+@app.get("/api/v1/health")
+def health():
+    return {"status": "ok", **recommender.get_backend_status()}
+
+@app.get("/api/v1/metrics")
+def get_metrics():
+    return {**recommender.get_metrics(), "interaction_store": interaction_store.stats()}
+
 @app.post("/api/v1/recommendations/personalized")
 def get_personalized_recommendations(
     limit: int = 20,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    from shared.models import ListeningHistory
+    # 1. Get user's recent history, oldest first, and their taste profile
+    rows = db.query(ListeningHistory.track_id).filter(
+        ListeningHistory.user_id == current_user.id
+    ).order_by(ListeningHistory.id.desc()).limit(USER_HISTORY_LIMIT).all()
+    user_history = [r[0] for r in reversed(rows)]
+    # every track they ever played is left out, not just the recent ones
+    played = {r[0] for r in db.query(ListeningHistory.track_id).filter(
+        ListeningHistory.user_id == current_user.id
+    ).distinct()}
+    profile = db.query(TasteProfile).filter(TasteProfile.user_id == current_user.id).first()
+    taste = recommender.get_taste_features(profile.weighted_sum, profile.total_weight) if profile else None
     
-    # 1. Get user's own history
-    user_history_entries = db.query(ListeningHistory).filter(ListeningHistory.user_id == current_user.id).all()
-    user_history = [e.track_id for e in user_history_entries]
-    
-    # 2. Get all history for collaborative filtering
-    all_history = db.query(ListeningHistory).all()
-    all_history_data = [{"user_id": e.user_id, "track_id": e.track_id} for e in all_history]
-    
-    recommendations = recommender.get_personalized_recommendations(user_history, all_history_data, limit)
+    # 2. Everyone else's history comes from the precomputed co-occurrence and ALS models
+    recommendations = recommender.get_personalized_recommendations(
+        user_history, limit, user_id=current_user.id, taste=taste, played=played
+    )
     return {
         "user_id": current_user.id,
         "recommendations": recommendations,
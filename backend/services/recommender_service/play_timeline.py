@@ -0,0 +1,73 @@
+import datetime
+import os
+import threading
+from collections import Counter, defaultdict
+
+# ids below the newest one counted that every refresh reads again, so plays
+# committed out of id order are still counted (see interaction_store.py)
+TIMELINE_OVERLAP = int(os.getenv("TIMELINE_OVERLAP", "1000"))
+
+
+class PlayTimeline:
+    """
+    Monthly play counts per genre, built from listening history.
+
+    Rows are fed incrementally (see `add`), so a service only has to fetch
+    the history with ids above `since()` before each snapshot. That re-reads
+    the last `overlap` ids to catch late commits; ids already counted there
+    are remembered and skipped.
+    """
+
+    def __init__(self, genres_of, months: int = 6, overlap: int = TIMELINE_OVERLAP):
+        # genres_of(track_ids) -> genre (or None) for each id
+        self.genres_of = genres_of
+        self.months = months
+        self.overlap = overlap
+        self.last_id = 0
+        self.counts = defaultdict(Counter)
+        # ids inside the re-read window that were already counted
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def since(self):
+        """Id to fetch rows after for the next `add`."""
+        return max(0, self.last_id - self.overlap)
+
+    def add(self, rows):
+        """Counts (id, track_id, played_at) rows; rows already seen are ignored."""
+        with self._lock:
+            rows = [r for r in rows if r[0] not in self._seen and r[0] > self.last_id - self.overlap]
+        if not rows:
+            return
+        genres = self.genres_of([r[1] for r in rows])
+        with self._lock:
+            for (row_id, _, played_at), genre in zip(rows, genres):
+                if row_id in self._seen or row_id <= self.last_id - self.overlap:
+                    continue
+                self._seen.add(row_id)
+                if genre is not None and played_at is not None:
+                    self.counts[(played_at.year, played_at.month)][genre] += 1
+            self.last_id = max(self.last_id, max(r[0] for r in rows))
+            floor = self.last_id - self.overlap
+            self._seen = {i for i in self._seen if i > floor}
+
+    def snapshot(self, top: int = 5, now: datetime.datetime = None):
+        """Play counts of the `top` most played genres over the last `months` months."""
+        now = now or datetime.datetime.utcnow()
+        buckets = []
+        year, month = now.year, now.month
+        for _ in range(self.months):
+            buckets.append((year, month))
+            year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+        buckets.reverse()
+
+        with self._lock:
+            window = [Counter(self.counts.get(b, ())) for b in buckets]
+        totals = sum(window, Counter())
+        return {
+            "months": [datetime.date(y, m, 1).strftime("%b") for y, m in buckets],
+            "trends": [
+                {"genre": genre, "data": [counts[genre] for counts in window]}
+                for genre, _ in totals.most_common(top)
+            ],
+        }
@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL for vector query results.
+
+    Entries are keyed by (track_id, filters) and remember the top_k they were
+    fetched with, so a request for fewer results is answered by slicing a
+    larger cached result instead of going back to the vector backend.
+    """
+
+    def __init__(self, maxsize: int = 2048, ttl: float = 600.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _key(track_id: str, filters):
+        if filters:
+            filters = tuple(sorted((k, repr(v)) for k, v in filters.items()))
+        return (track_id, filters or None)
+
+    def get(self, track_id: str, top_k: int, filters: dict = None):
+        """Returns the first `top_k` cached matches, or None on a miss."""
+        if self.maxsize <= 0:
+            return None
+        key = self._key(track_id, filters)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None or entry[1] < top_k:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2][:top_k]
+
+    def put(self, track_id: str, top_k: int, matches: list, filters: dict = None):
+        if self.maxsize <= 0:
+            return
+        key = self._key(track_id, filters)
+        now = self._clock()
+        with self._lock:
+            current = self._entries.get(key)
+            # keep a larger, still fresh result; it can answer this top_k too
+            if current is not None and current[0] > now and current[1] > top_k:
+                return
+            self._entries[key] = (now + self.ttl, top_k, matches)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def set_version(self, version):
+        """Drops every entry when the dataset the results refer to changes."""
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "dataset_version": self._version,
+            }
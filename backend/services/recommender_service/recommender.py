@@ -1,15 +1,43 @@
 import pandas as pd
 import os
 from sklearn.preprocessing import MinMaxScaler
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from dotenv import load_dotenv
 
+# pinecone is an optional dependency; fall back to in-memory similarity if unavailable
 try:
     from pinecone import Pinecone
-except ImportError:
+except ImportError:  # pragma: no cover - optional
     Pinecone = None
 
+try:
+    from .vector_index import ExactIndex, build_vector_index, normalize_rows
+    from .knn_graph import KNN_GRAPH_FILE, KnnGraph
+    from .catalog import CATALOG_DIR_NAME, load_catalog
+    from .query_cache import QueryCache
+    from .circuit_breaker import CLOSED, OPEN, CircuitBreaker
+    from .moods import MOOD_OPERATORS, load_moods
+    from .search_index import SUGGEST_TRACK, build_search_index, build_suggest_index
+    from .sequencing import SMOOTH_POOL_FACTOR, smooth_order
+    from .cooccurrence import COOCCURRENCE_FILE, CooccurrenceModel
+    from .factorization import FactorModel
+    from .taste_profile import taste_vector, update_taste
+except ImportError:
+    from vector_index import ExactIndex, build_vector_index, normalize_rows
+    from knn_graph import KNN_GRAPH_FILE, KnnGraph
+    from catalog import CATALOG_DIR_NAME, load_catalog
+    from query_cache import QueryCache
+    from circuit_breaker import CLOSED, OPEN, CircuitBreaker
+    from moods import MOOD_OPERATORS, load_moods
+    from search_index import SUGGEST_TRACK, build_search_index, build_suggest_index
+    from sequencing import SMOOTH_POOL_FACTOR, smooth_order
+    from cooccurrence import COOCCURRENCE_FILE, CooccurrenceModel
+    from factorization import FactorModel
+    from taste_profile import taste_vector, update_taste
+
 load_dotenv()
 
 # dataset is stored at the workspace root, not inside services/.
@@ -17,6 +45,11 @@ PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..
 # Handle data paths flexibly for Docker vs Local
 DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data"))
 DATASET_PATH = os.path.join(DATA_DIR, "cleaned_dataset.csv")
+# optional JSON file overriding the built-in mood definitions (see moods.py)
+MOODS_PATH = os.getenv("MOODS_PATH", os.path.join(DATA_DIR, "moods.json"))
+# columnar copy of the dataset written by clean_data.py; run_services.py points
+# CATALOG_DIR at a copy published to shared memory
+CATALOG_DIR = os.getenv("CATALOG_DIR", os.path.join(DATA_DIR, CATALOG_DIR_NAME))
 
 FEATURE_COLS = [
     'danceability', 'energy', 'key', 'loudness', 'mode', 
@@ -24,20 +57,103 @@ FEATURE_COLS = [
     'liveness', 'valence', 'tempo', 'time_signature'
 ]
 
+# threads issuing Pinecone queries (batch requests query seeds concurrently)
+PINECONE_BATCH_WORKERS = int(os.getenv("PINECONE_BATCH_WORKERS", "8"))
+# latency budget for Pinecone queries in ms (0 waits indefinitely); past it the
+# local index answers. PINECONE_HEDGE computes the local answer in parallel.
+PINECONE_QUERY_BUDGET_MS = float(os.getenv("PINECONE_QUERY_BUDGET_MS", "300"))
+PINECONE_HEDGE = os.getenv("PINECONE_HEDGE", "false").lower() in ("1", "true", "yes")
+# client-side timeout in seconds for a single Pinecone query, so calls nobody
+# waits for any more can't run on indefinitely
+PINECONE_QUERY_TIMEOUT = float(os.getenv("PINECONE_QUERY_TIMEOUT", "2"))
+# cached Pinecone results per seed track (0 disables the cache)
+PINECONE_CACHE_SIZE = int(os.getenv("PINECONE_CACHE_SIZE", "2048"))
+PINECONE_CACHE_TTL = float(os.getenv("PINECONE_CACHE_TTL", "600"))
+# circuit breaker: consecutive failures before Pinecone is bypassed, seconds
+# before a trial request is let through, and how often an open circuit is re-probed
+PINECONE_FAILURE_THRESHOLD = int(os.getenv("PINECONE_FAILURE_THRESHOLD", "3"))
+PINECONE_RESET_TIMEOUT = float(os.getenv("PINECONE_RESET_TIMEOUT", "30"))
+PINECONE_PROBE_INTERVAL = float(os.getenv("PINECONE_PROBE_INTERVAL", "10"))
+# most recent distinct tracks whose co-listen neighbours seed personalised recommendations
+PERSONALIZED_SEED_TRACKS = int(os.getenv("PERSONALIZED_SEED_TRACKS", "10"))
+# weight of each personalised component once its scores are scaled to a 0-1
+# maximum; content similarities bunch up near 1, so they count least
+HYBRID_CF_WEIGHT = float(os.getenv("HYBRID_CF_WEIGHT", "1.0"))
+HYBRID_MF_WEIGHT = float(os.getenv("HYBRID_MF_WEIGHT", "0.75"))
+HYBRID_CONTENT_WEIGHT = float(os.getenv("HYBRID_CONTENT_WEIGHT", "0.5"))
+
+def dataset_version(path: str):
+    """Cheap fingerprint of the dataset file, used to invalidate derived artifacts."""
+    stat = os.stat(path)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+def max_normalized(scores):
+    """Scales scores so the best one is 1; negatives are clipped to 0."""
+    scores = np.clip(np.asarray(scores, dtype=np.float64), 0, None)
+    top = scores.max(initial=0.0)
+    return scores / top if top > 0 else scores
+
+def scale_features(df):
+    """Min-max scales FEATURE_COLS into the float32 space every similarity index uses."""
+    return MinMaxScaler().fit_transform(df[FEATURE_COLS]).astype(np.float32)
+
 class Recommender:
     def __init__(self):
         self.df = pd.DataFrame()
-        self.scaled_features = np.zeros((0, len(FEATURE_COLS)))
+        self.scaled_features = np.zeros((0, len(FEATURE_COLS)), dtype=np.float32)
+        # unit-length copy of scaled_features, so cosine similarity is a plain dot product
+        self.unit_features = self.scaled_features
+        # indexes derived from the catalog, each built (or loaded) on first use
+        # so a service only pays for the ones it queries; see _derived_index
+        self._derived = {}
+        self._derived_locks = {}
+        self.pc = None
+        self.index = None
+        self.query_cache = QueryCache(PINECONE_CACHE_SIZE, PINECONE_CACHE_TTL)
+        self.breaker = CircuitBreaker(
+            PINECONE_FAILURE_THRESHOLD, PINECONE_RESET_TIMEOUT,
+            probe=self._probe_pinecone, probe_interval=PINECONE_PROBE_INTERVAL
+        )
+        self._remote_pool = ThreadPoolExecutor(max_workers=PINECONE_BATCH_WORKERS, thread_name_prefix="pinecone")
+        self._query_stats_lock = threading.Lock()
+        self._query_stats = dict.fromkeys(["remote_answered", "remote_failed", "deadline_exceeded", "cancelled", "hedge_wins"], 0)
+        self.dataset_version = None
+        # optional precomputed neighbour graph (see build_knn_graph.py)
+        self.knn_graph = None
+        # mood -> row positions matching its conditions, compiled at load time
+        self.moods = load_moods(MOODS_PATH)
+        self.mood_index = {}
+        # lower-cased genre -> row positions, and the sorted genre names
+        self.genre_index = {}
+        self.genres = []
+        # dataset-wide trend statistics, computed once per load
+        self.trend_summary = None
+        # row positions sorted by tempo, for workout phase range queries
+        self.tempo_order = np.zeros(0, dtype=np.int64)
+        self.tempo_sorted = np.zeros(0)
+        self.energy_by_tempo = np.zeros(0)
+        # column arrays backing _records, filled on first use
+        self._columns = None
+        # co-listened tracks per track (see build_cooccurrence.py), kept
+        # current by the service's interaction store
+        self.cooccurrence = CooccurrenceModel.open(os.path.join(DATA_DIR, COOCCURRENCE_FILE))
+        # optional implicit ALS user/item factors (see train_als.py)
+        self.factor_model = FactorModel.open(DATA_DIR)
+        self._rng = np.random.default_rng()
         try:
             self._load_data()
         except Exception as e:
+            # don't crash the whole app on missing data; log and continue with empty dataset
             print(f"WARNING: Recommender initialization failed: {e}")
             print("Recommendations will return empty results until the dataset is fixed.")
 
     def _load_data(self):
-        if not os.path.exists(DATASET_PATH):
+        csv_version = dataset_version(DATASET_PATH) if os.path.exists(DATASET_PATH) else None
+        catalog = load_catalog(CATALOG_DIR, csv_version)
+        if catalog is None and csv_version is None:
             raise FileNotFoundError(f"Dataset not found at {DATASET_PATH}. Please run clean_data.py first.")
         
+        # Load Pinecone if available and configured
         self.pc = None
         self.index = None
         if Pinecone is not None and os.getenv("PINECONE_API_KEY"):
@@ -55,118 +171,415 @@ class Recommender:
             else:
                 print("⚠️  PINECONE_API_KEY not set; using local similarity fallback.")
         
-        self.df = pd.read_csv(DATASET_PATH)
-        scaler = MinMaxScaler()
-        self.scaled_features = scaler.fit_transform(self.df[FEATURE_COLS])
-        
-    def get_recommendations(self, track_id: str, limit: int = 20):
+        if catalog is not None:
+            # memory-mapped columns with the features already scaled
+            self.df = catalog.df
+            self.scaled_features = catalog.scaled_features
+            self.unit_features = catalog.unit_features
+            self.dataset_version = catalog.version
+        else:
+            self.df = pd.read_csv(DATASET_PATH)
+            
+            # Normalize features
+            self.scaled_features = scale_features(self.df)
+            self.unit_features = normalize_rows(self.scaled_features)
+            self.dataset_version = csv_version
+        self._columns = None
+        self._derived = {}
+        self._compile_moods()
+        self._build_genre_index()
+        self._build_trend_summary()
+        self._build_tempo_index()
+        self.query_cache.set_version(self.dataset_version)
+        self.knn_graph = KnnGraph.open(os.path.join(DATA_DIR, KNN_GRAPH_FILE), self.dataset_version, len(self.df))
+
+    def _derived_index(self, name: str, build):
+        """
+        Returns the index called `name`, building it with `build()` the first
+        time it is asked for. The analytics and playlist services share this
+        class but never search, so they never build the search indexes.
+        """
+        if name in self._derived:
+            return self._derived[name]
+        with self._derived_locks.setdefault(name, threading.Lock()):
+            if name not in self._derived:
+                # nothing to index until the dataset loads
+                self._derived[name] = build() if self.dataset_version is not None else None
+            return self._derived[name]
+
+    def warm_up(self, *names):
+        """Builds the named indexes now, e.g. at service start, instead of on first use."""
+        for name in names:
+            getattr(self, name)
+
+    @property
+    def track_index(self):
+        """track_id -> row position in self.df, so lookups don't scan the catalog."""
+        return self._derived_index("track_index", self._build_track_index) or {}
+
+    @property
+    def search_index(self):
+        """Inverted index over track, artist and album words (see search_index.py)."""
+        return self._derived_index("search_index", lambda: build_search_index(self.df, DATA_DIR, self.dataset_version))
+
+    @property
+    def suggest_index(self):
+        """Sorted track/artist names for autocomplete."""
+        return self._derived_index("suggest_index", lambda: build_suggest_index(self.df, DATA_DIR, self.dataset_version))
+
+    @property
+    def vector_index(self):
+        """Local similarity index used whenever Pinecone is unavailable."""
+        index = self._derived_index(
+            "vector_index", lambda: build_vector_index(self.unit_features, DATA_DIR, self.dataset_version)
+        )
+        return index if index is not None else ExactIndex(self.unit_features)
+
+    @property
+    def genre_analytics(self):
+        """Lower-cased genre -> analytics summary."""
+        return self._derived_index("genre_analytics", self._build_genre_analytics) or {}
+
+    def _build_track_index(self):
+        """Maps every track_id to its row position (first occurrence wins)."""
+        track_index = {}
+        for pos, tid in enumerate(self.df['track_id'].tolist()):
+            track_index.setdefault(tid, pos)
+        return track_index
+
+    def get_recommendations(self, track_id: str, limit: int = 20, explain: bool = True):
         """
         Returns recommendations based on audio feature similarity using Pinecone.
-        Includes a breakdown of feature matches for explanations.
+        Includes a breakdown of feature matches for explanations unless
+        `explain` is False.
         """
-        # Find the index of the track in local DF for input vector
-        track_idx = self.df.index[self.df['track_id'] == track_id].tolist()
-        
-        if not track_idx:
+        return self.recommend(track_id, limit, explain)["recommendations"]
+
+    def recommend(self, track_id: str, limit: int = 20, explain: bool = True):
+        """
+        Same as get_recommendations, but also reports which backend answered:
+        "knn_graph", "pinecone" or "local_<index kind>".
+        """
+        batch = self.recommend_batch([track_id], limit, explain)
+        if track_id not in batch["results"]:
             # If not in local DF, skip or handle via Pinecone metadata
-            return []
-        
-        track_idx = track_idx[0]
-        input_vector = self.scaled_features[track_idx].tolist()
-        
-        recommendations = []
-        if self.index is not None:
-            try:
-                query_response = self.index.query(
-                    vector=input_vector,
-                    top_k=limit + 1,
-                    include_metadata=True
-                )
-            except Exception as e:
-                print(f"WARNING: Pinecone query failed ({e}); falling back to local similarity.")
-                self.index = None
+            return {"recommendations": [], "backend": None}
+        return {"recommendations": batch["results"][track_id], "backend": batch["backends"][track_id]}
+
+    def get_recommendations_batch(self, track_ids: list, limit: int = 20, explain: bool = True):
+        """
+        Recommendations for many seed tracks at once, keyed by seed track_id.
+        Unknown seeds are left out of the result.
+        """
+        return self.recommend_batch(track_ids, limit, explain)["results"]
+
+    def recommend_batch(self, track_ids: list, limit: int = 20, explain: bool = True):
+        """
+        Recommendations for many seed tracks at once, with the backend that
+        answered each seed. Local seeds are answered with a single batched index
+        search; Pinecone has no multi-vector query, so remote seeds are queried
+        concurrently, bounded by the PINECONE_QUERY_BUDGET_MS latency budget.
+        """
+        seeds = list(dict.fromkeys(tid for tid in track_ids if tid in self.track_index))
+        rows = [self.track_index[tid] for tid in seeds]
+
+        # precomputed neighbours are a constant-time slice of the mapped graph
+        if self._graph_covers(limit):
+            graph = self._graph_recommendations(rows, limit, explain)
+            return {"results": dict(zip(seeds, graph)), "backends": dict.fromkeys(seeds, "knn_graph")}
+
+        results, backends = {}, {}
+        hedged = None
+        # attempt Pinecone queries if we have an index and the circuit isn't open
+        if self.index is not None and seeds and self.breaker.state != OPEN:
+            remote, hedged = self._remote_recommendations(seeds, rows, limit, explain)
+            for tid, recs in remote.items():
+                results[tid] = recs[:limit]
+                backends[tid] = "pinecone"
+
+        # whatever Pinecone didn't answer (in time) goes through the local index in one call
+        pending = [i for i, tid in enumerate(seeds) if tid not in results]
+        if pending:
+            if hedged is None:
+                local = self._local_recommendations([rows[i] for i in pending], limit)
             else:
-                for match in query_response['matches']:
-                    if match['id'] == track_id:
-                        continue
-                    track = {
-                        "track_id": match['id'],
-                        "track_name": match['metadata']['track_name'],
-                        "artists": match['metadata']['artists'],
-                        "track_genre": match['metadata']['track_genre'],
-                        "popularity": match['metadata']['popularity'],
-                        "similarity_score": float(match['score'])
-                    }
-                    match_details = {}
-                    match_idx_list = self.df.index[self.df['track_id'] == match['id']].tolist()
-                    if match_idx_list:
-                        match_idx = match_idx_list[0]
-                        for col in FEATURE_COLS:
-                            diff = abs(self.scaled_features[track_idx][FEATURE_COLS.index(col)] - 
-                                       self.scaled_features[match_idx][FEATURE_COLS.index(col)])
-                            match_details[col] = round(1 - diff, 3)
-                    track['match_details'] = match_details
-                    recommendations.append(track)
+                local = [hedged[i] for i in pending]
+            local_backend = f"local_{self.vector_index.kind}"
+            for i, recs in zip(pending, local):
+                results[seeds[i]] = recs
+                backends[seeds[i]] = local_backend
+
+        return {
+            "results": {tid: results[tid] for tid in seeds},
+            "backends": {tid: backends[tid] for tid in seeds},
+        }
+
+    def _remote_recommendations(self, seeds: list, rows: list, limit: int, explain: bool):
+        """
+        Queries Pinecone for every seed and waits at most PINECONE_QUERY_BUDGET_MS.
+        With PINECONE_HEDGE on, the local answer is computed while the remote
+        queries are in flight, so missing the deadline costs no extra latency.
+        Returns ({seed: recommendations} for the seeds Pinecone answered in time,
+        the hedged local results or None).
+        """
+        futures = {
+            tid: self._remote_pool.submit(self._pinecone_recommendations, tid, row, limit, explain)
+            for tid, row in zip(seeds, rows)
+        }
+        deadline = time.monotonic() + PINECONE_QUERY_BUDGET_MS / 1000 if PINECONE_QUERY_BUDGET_MS > 0 else None
+
+        hedged = self._local_recommendations(rows, limit) if PINECONE_HEDGE else None
+
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        wait(futures.values(), timeout=timeout)
+
+        remote = {}
+        missed = False
+        for tid, future in futures.items():
+            if not future.done():
+                missed = True
+                self._count_query("deadline_exceeded")
+                if hedged is not None:
+                    self._count_query("hedge_wins")
+                # queries still waiting for a worker are dropped; ones already
+                # running finish and land in the query cache for the next request
+                if future.cancel():
+                    self._count_query("cancelled")
+                continue
+            recs = future.result()
+            if recs is None:
+                self._count_query("remote_failed")
+            else:
+                self._count_query("remote_answered")
+                remote[tid] = recs
+        if missed:
+            # a backend too slow for the budget is as unusable as a failing one
+            self.breaker.record_failure(TimeoutError(f"Pinecone missed the {PINECONE_QUERY_BUDGET_MS:.0f}ms budget"))
+        return remote, hedged
+
+    def _count_query(self, outcome: str):
+        with self._query_stats_lock:
+            self._query_stats[outcome] += 1
+
+    def _pinecone_recommendations(self, track_id: str, track_idx: int, limit: int, explain: bool = True):
+        """
+        Queries Pinecone for neighbours of a seed track.
+        Returns None if the query fails so the caller can fall back to local similarity.
+        """
+        matches = self._query_pinecone(track_id, track_idx, limit + 1)
+        if matches is None:
+            return None
+
+        # process pinecone results
+        matches = [m for m in matches if m['id'] != track_id]
+        recommendations = []
+        for match in matches:
+            recommendations.append({
+                "track_id": match['id'],
+                "track_name": match['metadata']['track_name'],
+                "artists": match['metadata']['artists'],
+                "track_genre": match['metadata']['track_genre'],
+                "popularity": match['metadata']['popularity'],
+                "similarity_score": float(match['score'])
+            })
+        if explain:
+            self._add_match_details(recommendations, track_idx)
+        return recommendations
+
+    def _query_pinecone(self, track_id: str, track_idx: int, top_k: int, filters: dict = None):
+        """
+        Raw Pinecone matches for a seed track, served from the result cache
+        when a fresh result with at least `top_k` matches is available.
+        Returns None if the query fails.
+        """
+        matches = self.query_cache.get(track_id, top_k, filters)
+        if matches is not None:
+            return matches
+        # an open circuit means Pinecone failed recently; skip it until it is re-probed
+        if not self.breaker.allow_request():
+            return None
+
+        query = {"vector": self.scaled_features[track_idx].tolist(), "top_k": top_k, "include_metadata": True}
+        if filters:
+            query["filter"] = filters
+        if PINECONE_QUERY_TIMEOUT > 0:
+            query["_request_timeout"] = PINECONE_QUERY_TIMEOUT
+        start = time.monotonic()
+        try:
+            query_response = self.index.query(**query)
+        except Exception as e:
+            print(f"WARNING: Pinecone query failed ({e}); falling back to local similarity.")
+            self.breaker.record_failure(e)
+            return None
+        # an answer that came after the budget doesn't count as a success; the
+        # request that gave up on it has already recorded the missed deadline
+        elapsed_ms = (time.monotonic() - start) * 1000
+        if PINECONE_QUERY_BUDGET_MS <= 0 or elapsed_ms <= PINECONE_QUERY_BUDGET_MS:
+            self.breaker.record_success()
+
+        # keep plain dicts so cached entries don't hold on to client objects
+        matches = [
+            {"id": m['id'], "score": float(m['score']), "metadata": dict(m['metadata'] or {})}
+            for m in query_response['matches']
+        ]
+        self.query_cache.put(track_id, top_k, matches, filters)
+        return matches
+
+    def _probe_pinecone(self):
+        """Cheap request used to check whether an open circuit can be closed again."""
+        self.index.describe_index_stats()
+
+    def get_backend_status(self):
+        """
+        Which backend currently answers similarity queries the precomputed
+        neighbour graph can't, for health checks.
+        """
+        if self.index is not None and self.breaker.state == CLOSED:
+            backend = "pinecone"
         else:
-            sim = cosine_similarity([input_vector], self.scaled_features).flatten()
-            indices = sim.argsort()[::-1]
-            for idx in indices:
-                if self.df.iloc[idx]['track_id'] == track_id:
-                    continue
-                rec = self.df.iloc[idx].to_dict()
-                rec['similarity_score'] = float(sim[idx])
-                recommendations.append(rec)
-                if len(recommendations) >= limit:
-                    break
-        return recommendations[:limit]
+            backend = f"local_{self.vector_index.kind}"
+        return {
+            "backend": backend,
+            "pinecone_configured": self.index is not None,
+            "circuit_breaker": self.breaker.stats(),
+            "local_index": self.vector_index.kind,
+            "knn_graph": self.knn_graph is not None,
+            "tracks": len(self.df),
+            "dataset_version": self.dataset_version,
+        }
+
+    def get_metrics(self):
+        """Counters for the vector backend, exposed by the service's metrics endpoint."""
+        return {
+            "pinecone_cache": self.query_cache.stats(),
+            "circuit_breaker": self.breaker.stats(),
+            "remote_queries": self._query_stats_snapshot(),
+            "item_cooccurrence": self.cooccurrence.stats(),
+            "matrix_factorization": self.factor_model.stats() if self.factor_model else None,
+        }
+
+    def _query_stats_snapshot(self):
+        with self._query_stats_lock:
+            return {
+                **self._query_stats,
+                "budget_ms": PINECONE_QUERY_BUDGET_MS,
+                "hedge": PINECONE_HEDGE,
+            }
+
+    def _add_match_details(self, recommendations: list, track_idx: int):
+        """
+        Per-feature closeness (1 - |difference| of scaled values) between the seed
+        and every recommendation, computed for all matches in one array operation.
+        Tracks missing from the local catalog get an empty breakdown.
+        """
+        match_rows = [self.track_index.get(track['track_id']) for track in recommendations]
+        known = [i for i, row in enumerate(match_rows) if row is not None]
+        for track in recommendations:
+            track['match_details'] = {}
+        if not known:
+            return
+
+        rows = [match_rows[i] for i in known]
+        diff = np.abs(self.scaled_features[rows] - self.scaled_features[track_idx]).astype(np.float64)
+        # round in float64 so the values serialise as e.g. 0.963, not 0.9629999995
+        closeness = np.round(1 - diff, 3)
+        for i, values in zip(known, closeness.tolist()):
+            recommendations[i]['match_details'] = dict(zip(FEATURE_COLS, values))
+
+    def _local_recommendations(self, seed_rows: list, limit: int):
+        """
+        Nearest neighbours of each seed row from the local similarity index,
+        excluding the seed itself. Returns one list of tracks per seed.
+        """
+        # one extra neighbour since each seed track matches itself
+        searches = self.vector_index.search_batch(self.scaled_features[seed_rows], limit + 1)
 
-    def get_personalized_recommendations(self, user_history: list, all_history_data: list, limit: int = 20):
+        picked = []
+        for seed_idx, (indices, scores) in zip(seed_rows, searches):
+            keep = indices != seed_idx
+            picked.append((indices[keep][:limit], scores[keep][:limit]))
+        return self._tracks_with_scores(picked)
+
+    def _graph_covers(self, limit: int):
+        return self.knn_graph is not None and limit <= self.knn_graph.k
+
+    def _graph_recommendations(self, seed_rows: list, limit: int, explain: bool = True):
+        """Neighbours of each seed row read from the precomputed graph."""
+        results = self._tracks_with_scores([self.knn_graph.lookup(row, limit) for row in seed_rows])
+        if explain:
+            # same per-feature breakdown Pinecone results carry
+            for row, recs in zip(seed_rows, results):
+                self._add_match_details(recs, row)
+        return results
+
+    def _tracks_with_scores(self, picked: list):
+        """
+        Turns a list of (rows, scores) pairs into lists of track dicts with a
+        similarity_score, gathering every row from the frame in one go.
+        """
+        if not picked:
+            return []
+        records = self.df.iloc[np.concatenate([rows for rows, _ in picked])].to_dict('records')
+        results = []
+        start = 0
+        for rows, scores in picked:
+            recs = records[start:start + len(rows)]
+            for rec, score in zip(recs, scores):
+                rec['similarity_score'] = float(score)
+            results.append(recs)
+            start += len(rows)
+        return results
+
+    def get_personalized_recommendations(self, user_history: list, limit: int = 20, user_id=None, taste: dict = None,
+                                         played=None):
         """
-        Hybrid Recommender: Combines Collaborative Filtering and Content-Based.
-        - user_history: list of track IDs the user has listened to.
-        - all_history_data: list of {'user_id': x, 'track_id': y} for all users.
+        Hybrid Recommender: Combines Item-Item Collaborative Filtering, Matrix Factorization and Content-Based.
+        - user_history: the user's recent track IDs, oldest first; seeds every component.
+        - user_id: the user's id in the ALS factors, if they were trained on.
+        - taste: the user's taste profile from get_taste_features, if they have one.
+        - played: every track ID the user has ever played, none of which is
+          recommended; defaults to user_history.
         """
         if not user_history:
             # Fallback to general popularity or trending
             return self.get_trend_analysis()['rising_genres'][:limit]
+        played = set(played) | set(user_history) if played is not None else set(user_history)
 
-        # 1. Collaborative Filtering Component (User-User)
-        # Find users who listened to the same tracks
-        user_history_set = set(user_history)
-        similar_users = {}
-        
-        for entry in all_history_data:
-            uid = entry['user_id']
-            tid = entry['track_id']
-            if tid in user_history_set:
-                similar_users[uid] = similar_users.get(uid, 0) + 1
-        
-        # Recommendation candidates from similar users
-        candidates = {}
-        for entry in all_history_data:
-            uid = entry['user_id']
-            tid = entry['track_id']
-            if uid in similar_users and tid not in user_history_set:
-                weight = similar_users[uid]
-                candidates[tid] = candidates.get(tid, 0) + weight
+        # 1. Collaborative Filtering Component (Item-Item)
+        # Sum the co-listen neighbour lists of the user's most recent tracks
+        seeds = list(dict.fromkeys(reversed(user_history)))[:PERSONALIZED_SEED_TRACKS]
+        cf_tracks, cf_scores = self.cooccurrence.score(seeds, exclude=played)
         
-        # 2. Content-Based Component (Pinecone)
-        # Get recommendations based on the user's most recent track
-        last_track_id = user_history[-1]
-        content_recs = self.get_recommendations(last_track_id, limit=limit*2)
+        # 2. Matrix Factorization Component (implicit ALS)
+        # Predicted preference of the user for every track: one product plus top-k
+        if self.factor_model is not None:
+            mf_tracks, mf_scores = self.factor_model.recommend(user_id, user_history, limit * 2, exclude=played)
+        else:
+            mf_tracks, mf_scores = [], np.zeros(0, dtype=np.float32)
+
+        # 3. Content-Based Component
+        # Tracks closest to the user's decayed taste vector, or else to their most recent track
+        if taste:
+            target = [taste[col] for col in FEATURE_COLS]
+            content_recs = self.get_recommendations_by_vector(target, limit=limit*2, exclude=played)
+        else:
+            last_track_id = user_history[-1]
+            content_recs = [t for t in self.get_recommendations(last_track_id, limit=limit*2)
+                            if t['track_id'] not in played]
         
-        # 3. Combine and Rank
+        # 4. Combine and Rank
+        # Each component scores on its own scale (summed co-listen weights,
+        # predicted preferences, cosine similarities), so bring them to a
+        # common 0-1 scale before weighting
         hybrid_scores = {}
-        
-        # Add collaborative candidates
-        for tid, score in candidates.items():
-            hybrid_scores[tid] = score * 0.5  # Normalize/Weighting
-            
-        # Add content candidates
-        for track in content_recs:
-            tid = track['track_id']
-            score = track['similarity_score']
-            hybrid_scores[tid] = hybrid_scores.get(tid, 0) + score
+        components = [
+            (cf_tracks, cf_scores, HYBRID_CF_WEIGHT),
+            (mf_tracks, mf_scores, HYBRID_MF_WEIGHT),
+            ([t['track_id'] for t in content_recs], [t['similarity_score'] for t in content_recs], HYBRID_CONTENT_WEIGHT),
+        ]
+        for tids, scores, weight in components:
+            for tid, score in zip(tids, max_normalized(scores).tolist()):
+                hybrid_scores[tid] = hybrid_scores.get(tid, 0) + score * weight
             
         # Final ranking
         sorted_tids = sorted(hybrid_scores.items(), key=lambda x: x[1], reverse=True)[:limit]
@@ -179,74 +592,45 @@ class Recommender:
             
         return final_recs
 
-    def get_recommendations_by_mood(self, mood: str, limit: int = 20):
+    def get_moods(self):
+        """Names of the moods get_recommendations_by_mood understands."""
+        return list(self.mood_index or self.moods)
+
+    def _compile_moods(self):
+        """Evaluates every mood's conditions once, keeping the matching row positions."""
+        mood_index = {}
+        for mood, conditions in self.moods.items():
+            missing = [col for col, _, _ in conditions if col not in self.df.columns]
+            if missing:
+                print(f"⚠️  Skipping mood '{mood}': unknown columns {missing}")
+                continue
+            mask = np.ones(len(self.df), dtype=bool)
+            for col, op, value in conditions:
+                mask &= MOOD_OPERATORS[op](self.df[col].to_numpy(), value)
+            mood_index[mood] = np.flatnonzero(mask)
+        self.mood_index = mood_index
+
+    def get_recommendations_by_mood(self, mood: str, limit: int = 20, smooth: bool = False):
         """
         Returns random recommendations based on mood profiles.
+        Unknown moods sample from the whole catalog. With `smooth`, a larger
+        sample is drawn and ordered to minimise tempo, key and energy jumps.
         """
-        mood = mood.lower()
-        filtered_df = self.df.copy()
-        
-        if mood == 'happy':
-            # High valence (positive), High energy
-            filtered_df = filtered_df[
-                (filtered_df['valence'] > 0.6) & 
-                (filtered_df['energy'] > 0.6)
-            ]
-        elif mood == 'sad':
-            # Low valence (negative), Low energy
-            filtered_df = filtered_df[
-                (filtered_df['valence'] < 0.4) & 
-                (filtered_df['energy'] < 0.4)
-            ]
-        elif mood == 'energetic':
-            # High energy, High danceability
-            filtered_df = filtered_df[
-                (filtered_df['energy'] > 0.7) & 
-                (filtered_df['danceability'] > 0.6)
-            ]
-        elif mood == 'calm':
-            # Low energy, High acousticness
-            filtered_df = filtered_df[
-                (filtered_df['energy'] < 0.4) & 
-                (filtered_df['acousticness'] > 0.5)
-            ]
-        elif mood == 'focused':
-            # High instrumentalness, Low speechiness
-            filtered_df = filtered_df[
-                (filtered_df['instrumentalness'] > 0.5) & 
-                (filtered_df['speechiness'] < 0.3)
-            ]
-        elif mood == 'party':
-            # High danceability, High energy, High valence
-            filtered_df = filtered_df[
-                (filtered_df['danceability'] > 0.7) & 
-                (filtered_df['energy'] > 0.7) &
-                (filtered_df['valence'] > 0.6)
-            ]
-        elif mood == 'workout':
-            # Highest energy, High tempo (> 120 bpm)
-            filtered_df = filtered_df[
-                (filtered_df['energy'] > 0.8) & 
-                (filtered_df['tempo'] > 120)
-            ]
-        elif mood == 'chill':
-            # Low energy, Mid valence, High acousticness or instrumentalness
-            filtered_df = filtered_df[
-                (filtered_df['energy'] < 0.5) & 
-                (filtered_df['acousticness'] > 0.4)
-            ]
-            
-        if filtered_df.empty:
+        rows = self.mood_index.get(mood.lower())
+        total = len(self.df) if rows is None else len(rows)
+        if total == 0:
             return []
             
-        # Randomly sample from the filtered results to ensure variety
-        # Use min to avoid error if filtered_df has fewer rows than limit
-        sample_size = min(len(filtered_df), limit)
-        results = filtered_df.sample(n=sample_size)
+        # Randomly sample from the matching rows to ensure variety
+        # Use min to avoid error if fewer rows match than limit
+        pool_size = limit * SMOOTH_POOL_FACTOR if smooth else limit
+        picks = self._rng.choice(total, size=min(total, pool_size), replace=False)
+        if rows is not None:
+            picks = rows[picks]
+        if smooth:
+            picks = self._sequence(picks, limit)
         
-        return results.to_dict('records')
-
-        return results.to_dict('records')
+        return self._records(picks)
 
     def get_recommendations_by_features(self, target_features: dict, limit: int = 20):
         """
@@ -266,66 +650,143 @@ class Recommender:
             val = target_features.get(col, 0.5) # Default to 0.5 (neutral)
             target_vector[0, i] = val
             
-        # Calculate similarity
-        sim_scores = cosine_similarity(target_vector, self.scaled_features).flatten()
-        
-        # Get top indices
-        top_indices = sim_scores.argsort()[::-1][:limit]
+        # Nearest tracks by cosine similarity
+        top_indices, sim_scores = self.vector_index.search(target_vector, limit)
         
         recommendations = []
-        for idx in top_indices:
+        for idx, score in zip(top_indices, sim_scores):
             track = self.df.iloc[idx].to_dict()
-            track['similarity_score'] = float(sim_scores[idx])
+            track['similarity_score'] = float(score)
             recommendations.append(track)
             
         return recommendations
 
         return results.to_dict('records')
 
+    def get_recommendations_by_vector(self, vector, limit: int = 20, exclude=()):
+        """
+        Tracks nearest to a vector in scaled feature space (e.g. a taste
+        profile), leaving out the track ids in `exclude`.
+        """
+        exclude = set(exclude)
+        rows, scores = self.vector_index.search(np.asarray(vector, dtype=np.float32), limit + len(exclude))
+        recommendations = []
+        for track, score in zip(self._records(rows), scores.tolist()):
+            if track['track_id'] in exclude:
+                continue
+            track['similarity_score'] = float(score)
+            recommendations.append(track)
+        return recommendations[:limit]
+
+    def update_taste_profile(self, weighted_sum, total_weight: float, track_id: str):
+        """
+        Folds a played track into a taste profile stored as (weighted_sum,
+        total_weight); returns the new pair, or None for an unknown track.
+        """
+        row = self.track_index.get(track_id)
+        if row is None:
+            return None
+        return update_taste(weighted_sum, total_weight, self.scaled_features[row])
+
+    def get_taste_features(self, weighted_sum, total_weight: float):
+        """A taste profile's decayed mean as {feature: scaled value}, or None if it is empty."""
+        vector = taste_vector(weighted_sum, total_weight, len(FEATURE_COLS))
+        if vector is None:
+            return None
+        return dict(zip(FEATURE_COLS, vector.tolist()))
+
+    def _build_genre_index(self):
+        """Groups row positions by lower-cased genre in one pass over the column."""
+        self.genre_index = {}
+        self.genres = []
+        if 'track_genre' not in self.df.columns:
+            return
+        genres = self.df['track_genre']
+        self.genres = sorted(genres.dropna().unique().tolist())
+
+        codes, uniques = pd.factorize(genres.str.lower())
+        valid = np.flatnonzero(codes >= 0)
+        # stable sort keeps each posting list in row order
+        order = valid[np.argsort(codes[valid], kind='stable')]
+        bounds = np.cumsum(np.bincount(codes[valid], minlength=len(uniques)))[:-1]
+        self.genre_index = dict(zip(uniques, np.split(order, bounds)))
+
     def get_genres(self):
         """Returns a list of unique genres."""
-        if 'track_genre' in self.df.columns:
-            return sorted(self.df['track_genre'].dropna().unique().tolist())
-        return []
+        return list(self.genres)
 
     def get_tracks_by_genre(self, genre: str, limit: int = 20):
         """Returns tracks for a specific genre."""
-        if 'track_genre' not in self.df.columns:
-            return []
-            
-        genre_tracks = self.df[self.df['track_genre'].str.lower() == genre.lower()]
-        
-        if genre_tracks.empty:
+        rows = self.genre_index.get(genre.lower())
+        if rows is None or len(rows) == 0:
             return []
             
         # Return random sample
-        sample_size = min(len(genre_tracks), limit)
-        return genre_tracks.sample(n=sample_size).to_dict('records')
+        picks = self._rng.choice(rows, size=min(len(rows), limit), replace=False)
+        return self.df.iloc[picks].to_dict('records')
 
-    def search_tracks(self, query: str, limit: int = 20):
+    def search_tracks(self, query: str, limit: int = 20, fuzzy: bool = False):
         """
-        Simple case-insensitive search by track name or artist.
+        Case- and accent-insensitive search over track names, artists and albums.
+        Every word of the query must match a word (or the start of one) in the
+        track; with `fuzzy`, words within a small edit distance match too.
+        Results are ranked by relevance, then popularity.
         """
-        if not query:
+        if not query or self.search_index is None:
             return []
         
-        mask = (
-            self.df['track_name'].str.contains(query, case=False, na=False) | 
-            self.df['artists'].str.contains(query, case=False, na=False)
-        )
-        results = self.df[mask].head(limit)
-        return results.to_dict('records')
+        rows = self.search_index.search(query, limit, fuzzy=fuzzy)
+        return self.df.iloc[rows].to_dict('records')
+
+    def get_suggestions(self, prefix: str, limit: int = 10):
+        """
+        Autocomplete for the search box: the most popular track names and
+        artists starting with `prefix`.
+        """
+        if not prefix or self.suggest_index is None:
+            return []
+
+        index = self.suggest_index
+        suggestions = []
+        for pos in index.suggest(prefix, limit):
+            if index.kinds[pos] == SUGGEST_TRACK:
+                suggestions.append({
+                    "type": "track",
+                    "text": index.labels[pos],
+                    "track_id": index.track_ids[pos],
+                    "artists": index.artists[pos],
+                    "popularity": float(index.popularity[pos]),
+                })
+            else:
+                suggestions.append({
+                    "type": "artist",
+                    "text": index.labels[pos],
+                    "popularity": float(index.popularity[pos]),
+                })
+        return suggestions
 
     def get_track_by_id(self, track_id: str):
-        row = self.df[self.df['track_id'] == track_id]
-        if row.empty:
+        pos = self.track_index.get(track_id)
+        if pos is None:
             return None
-        return row.iloc[0].to_dict()
+        return self.df.iloc[pos].to_dict()
+
+    def get_tracks_by_ids(self, track_ids: list):
+        """
+        Bulk lookup of tracks by id, preserving the requested order.
+        Unknown ids are skipped.
+        """
+        positions = [self.track_index[tid] for tid in track_ids if tid in self.track_index]
+        if not positions:
+            return []
+        return self.df.iloc[positions].to_dict('records')
 
-    def get_workout_playlist(self, duration_minutes: int = 30, target_intensity: str = 'medium'):
+    def get_workout_playlist(self, duration_minutes: int = 30, target_intensity: str = 'medium', smooth: bool = False):
         """
         Generates a sequenced workout playlist with BPM phasing.
         Phases: Warm-up (20%), Peak (60%), Cool-down (20%)
+        With `smooth`, each phase is ordered to minimise tempo, key and energy
+        jumps, continuing from the last track of the previous phase.
         """
         # Average track duration ~3.5 minutes
         total_tracks = max(int(duration_minutes / 3.5), 5)
@@ -353,83 +814,145 @@ class Recommender:
             phases[1]['energy_min'] = 0.6
             phases[1]['bpm_range'] = (120, 150)
             
-        workout_tracks = []
+        picks = []
         
         for phase in phases:
-            filtered_df = self.df[
-                (self.df['tempo'] >= phase['bpm_range'][0]) & 
-                (self.df['tempo'] <= phase['bpm_range'][1]) &
-                (self.df['energy'] >= phase['energy_min']) &
-                (self.df['energy'] <= phase['energy_max'])
-            ]
+            bpm_min, bpm_max = phase['bpm_range']
+            candidates = self._tempo_range(bpm_min, bpm_max, phase['energy_min'], phase['energy_max'])
             
-            if filtered_df.empty:
+            if len(candidates) == 0:
                 # Fallback: Relax energy constraints if no exact matches
-                filtered_df = self.df[
-                    (self.df['tempo'] >= phase['bpm_range'][0] - 10) & 
-                    (self.df['tempo'] <= phase['bpm_range'][1] + 10)
-                ]
+                candidates = self._tempo_range(bpm_min - 10, bpm_max + 10)
             
-            sample_size = min(len(filtered_df), phase['count'])
-            if not filtered_df.empty:
-                phase_tracks = filtered_df.sample(n=sample_size).to_dict('records')
-                workout_tracks.extend(phase_tracks)
+            pool_size = phase['count'] * SMOOTH_POOL_FACTOR if smooth else phase['count']
+            sample_size = min(len(candidates), pool_size)
+            if sample_size:
+                phase_picks = self._rng.choice(candidates, size=sample_size, replace=False)
+                if smooth:
+                    phase_picks = self._sequence(phase_picks, phase['count'], picks[-1][-1] if picks else None)
+                picks.append(phase_picks)
                 
-        return workout_tracks
+        if not picks:
+            return []
+        return self._records(np.concatenate(picks))
 
-    def get_genre_analytics(self, genre: str):
+    def _sequence(self, rows, count: int, after_row=None):
         """
-        Calculates aggregate analytics for a specific genre.
-        Includes average audio features, popularity distribution, and top tracks.
+        Picks `count` of the candidate `rows` in a smooth play order (see
+        sequencing.py), starting next to `after_row` if given.
         """
-        genre_tracks = self.df[self.df['track_genre'].str.lower() == genre.lower()].copy()
-        
-        if genre_tracks.empty:
-            return None
-            
+        tempo = self.df['tempo'].to_numpy()
+        key = self.df['key'].to_numpy()
+        energy = self.df['energy'].to_numpy()
+        start = None if after_row is None else (tempo[after_row], key[after_row], energy[after_row])
+        order = smooth_order(tempo[rows], key[rows], energy[rows], count, start)
+        return rows[order]
+
+    def _records(self, rows):
+        """
+        Same as self.df.iloc[rows].to_dict('records'), built straight from the
+        column arrays; for a handful of rows this avoids most of pandas' overhead.
+        """
+        if self._columns is None:
+            self._columns = [(col, self.df[col].to_numpy()) for col in self.df.columns]
+        values = [array[rows].tolist() for _, array in self._columns]
+        names = [col for col, _ in self._columns]
+        return [dict(zip(names, row)) for row in zip(*values)]
+
+    def _build_tempo_index(self):
+        """Row positions sorted by tempo, with energy laid out in the same order."""
+        if 'tempo' not in self.df.columns or 'energy' not in self.df.columns:
+            self.tempo_order = np.zeros(0, dtype=np.int64)
+            self.tempo_sorted = np.zeros(0)
+            self.energy_by_tempo = np.zeros(0)
+            return
+        tempo = self.df['tempo'].to_numpy(dtype=np.float64)
+        # NaN tempos sort last and never fall inside a range
+        self.tempo_order = np.argsort(tempo, kind='stable')
+        self.tempo_sorted = tempo[self.tempo_order]
+        self.energy_by_tempo = self.df['energy'].to_numpy(dtype=np.float64)[self.tempo_order]
+
+    def _tempo_range(self, bpm_min, bpm_max, energy_min=None, energy_max=None):
+        """Row positions with bpm_min <= tempo <= bpm_max and, if given, energy in range."""
+        lo = np.searchsorted(self.tempo_sorted, bpm_min, side='left')
+        hi = np.searchsorted(self.tempo_sorted, bpm_max, side='right')
+        rows = self.tempo_order[lo:hi]
+        if energy_min is not None:
+            energy = self.energy_by_tempo[lo:hi]
+            rows = rows[(energy >= energy_min) & (energy <= energy_max)]
+        return rows
+
+    def _build_genre_analytics(self):
+        """
+        Materialises every genre's analytics in one grouped pass over the catalog,
+        keyed like genre_index by lower-cased genre.
+        """
+        genre_analytics = {}
+        if 'track_genre' not in self.df.columns or self.df.empty:
+            return genre_analytics
+        genre_key = self.df['track_genre'].str.lower()
+
         # Calculate mean for all 17 audio features
         # Note: FEATURE_COLS only has 12 features, but the dataset has 17. 
         # Let's include all numeric columns that are relevant.
-        numeric_cols = genre_tracks.select_dtypes(include=[np.number]).columns.tolist()
-        # Filter out key-like/ID columns if necessary, but averages are usually fine.
-        
-        averages = genre_tracks[numeric_cols].mean().to_dict()
-        
-        # Popularity stats
-        popularity_stats = {
-            "avg": float(genre_tracks['popularity'].mean()),
-            "max": int(genre_tracks['popularity'].max()),
-            "min": int(genre_tracks['popularity'].min())
-        }
-        
+        numeric_cols = self.df.select_dtypes(include=[np.number]).columns.tolist()
+        averages = self.df[numeric_cols].groupby(genre_key).mean()
+        popularity = self.df['popularity'].groupby(genre_key).agg(['mean', 'max', 'min', 'size'])
+        names = self.df['track_genre'].groupby(genre_key).first()
+
         # Top 5 tracks by popularity
-        top_tracks = genre_tracks.sort_values(by='popularity', ascending=False).head(5)
-        top_tracks_list = top_tracks.to_dict('records')
-        
+        ranked = self.df.sort_values(by='popularity', ascending=False, kind='stable')
+        ranked_key = genre_key.loc[ranked.index]
+        top_tracks = ranked.groupby(ranked_key, sort=False).head(5)
+        top_tracks = {g: tracks.to_dict('records') for g, tracks in top_tracks.groupby(ranked_key.loc[top_tracks.index], sort=False)}
+
         # Top 5 artists by track count and popularity
-        top_artists = genre_tracks.groupby('artists')['popularity'].agg(['mean', 'count']).sort_values(by='mean', ascending=False).head(5)
-        top_artists_list = []
-        for artist, row in top_artists.iterrows():
-            top_artists_list.append({
+        artist_stats = self.df['popularity'].groupby([genre_key, self.df['artists']]).agg(['mean', 'count'])
+        artist_stats = artist_stats.sort_values(by='mean', ascending=False, kind='stable')
+        artist_stats = artist_stats.groupby(level=0, sort=False).head(5)
+        top_artists = {}
+        for (g, artist), row in artist_stats.iterrows():
+            top_artists.setdefault(g, []).append({
                 "name": artist,
                 "avg_popularity": float(row['mean']),
                 "track_count": int(row['count'])
             })
-            
-        return {
-            "genre": genre,
-            "total_tracks": len(genre_tracks),
-            "average_features": averages,
-            "popularity_stats": popularity_stats,
-            "top_tracks": top_tracks_list,
-            "top_artists": top_artists_list
-        }
-    def get_trend_analysis(self):
+
+        for g, stats in popularity.iterrows():
+            genre_analytics[g] = {
+                "genre": names[g],
+                "total_tracks": int(stats['size']),
+                "average_features": averages.loc[g].to_dict(),
+                "popularity_stats": {
+                    "avg": float(stats['mean']),
+                    "max": int(stats['max']),
+                    "min": int(stats['min'])
+                },
+                "top_tracks": top_tracks.get(g, []),
+                "top_artists": top_artists.get(g, [])
+            }
+        return genre_analytics
+
+    def get_genre_analytics(self, genre: str):
         """
-        Identifies and visualizes music trends (FR-009).
-        Since we lack temporal data, we simulate 'Rising' trends and analyze 
-        popularity-feature correlations.
+        Aggregate analytics for a specific genre: average audio features,
+        popularity distribution, top tracks and top artists.
         """
+        analytics = self.genre_analytics.get(genre.lower())
+        if analytics is None:
+            return None
+        return {**analytics, "genre": genre}
+
+    def get_all_genre_analytics(self):
+        """Analytics summaries for every genre, ordered by genre name."""
+        return sorted(self.genre_analytics.values(), key=lambda a: a["genre"])
+
+    def _build_trend_summary(self):
+        """Catalog-wide trend statistics; they only change with the dataset."""
+        if self.df.empty:
+            self.trend_summary = None
+            return
+
         # 1. Rising Genres (Top 10 by average popularity)
         genre_popularity = self.df.groupby('track_genre')['popularity'].mean().sort_values(ascending=False).head(10)
         rising_genres = [
@@ -441,29 +964,34 @@ class Recommender:
         global_averages = self.df[FEATURE_COLS].mean().to_dict()
 
         # 3. Popularity vs. Audio Feature Correlations
-        correlations = {}
-        for col in FEATURE_COLS:
-            correlations[col] = float(self.df['popularity'].corr(self.df[col]))
+        correlations = {col: float(c) for col, c in self.df[FEATURE_COLS].corrwith(self.df['popularity']).items()}
 
         # 4. Explicit Content Trends (Explicit vs. Non-Explicit popularity)
         explicit_trend = self.df.groupby('explicit')['popularity'].mean().to_dict()
-        
-        # 5. Simulated Historical Trends (demonstrating FR-009 visualization)
-        # We'll generate some trend lines for the top 5 genres
-        simulated_trends = []
-        months = ["Sep", "Oct", "Nov", "Dec", "Jan", "Feb"]
-        for genre in list(genre_popularity.index[:5]):
-            base_pop = genre_popularity[genre]
-            series = [float(base_pop + np.random.normal(0, 2)) for _ in months]
-            simulated_trends.append({"genre": genre, "data": series})
 
-        return {
+        self.trend_summary = {
             "rising_genres": rising_genres,
             "feature_averages": global_averages,
             "correlations": correlations,
             "explicit_popularity": explicit_trend,
-            "simulated_timeline": {
-                "months": months,
-                "trends": simulated_trends
-            }
         }
+
+    def get_trend_analysis(self, timeline: dict = None):
+        """
+        Identifies and visualizes music trends (FR-009): genre popularity,
+        popularity-feature correlations and, when given, the play-count
+        timeline built from listening history (see play_timeline.py).
+        """
+        summary = self.trend_summary or {
+            "rising_genres": [], "feature_averages": {}, "correlations": {}, "explicit_popularity": {}
+        }
+        return {**summary, "timeline": timeline or {"months": [], "trends": []}}
+
+    def get_track_genres(self, track_ids: list):
+        """Genre of each track id, None for unknown ids."""
+        if 'track_genre' not in self.df.columns:
+            return [None] * len(track_ids)
+        genres = self.df['track_genre'].to_numpy(dtype=object)
+        found = (genres[self.track_index[tid]] if tid in self.track_index else None for tid in track_ids)
+        # missing genres come back as NaN from the CSV
+        return [g if isinstance(g, str) else None for g in found]
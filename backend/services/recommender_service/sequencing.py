@@ -0,0 +1,59 @@
+import numpy as np
+
+# Transition cost between consecutive tracks: a 10 bpm tempo change, one step
+# around the circle of fifths and a 0.1 energy change each cost one unit
+TEMPO_STEP = 10.0
+ENERGY_STEP = 0.1
+KEY_STEP = 1.0
+# candidates drawn per playlist slot when sequencing, so the ordering has
+# neighbours to choose from
+SMOOTH_POOL_FACTOR = 4
+
+
+def key_distance(a, b):
+    """Steps between pitch classes around the circle of fifths; unknown keys (-1) cost nothing."""
+    a = np.asarray(a)
+    b = np.asarray(b)
+    steps = np.abs((a * 7) % 12 - (b * 7) % 12)
+    steps = np.minimum(steps, 12 - steps)
+    return np.where((a < 0) | (b < 0), 0, steps)
+
+
+def transition_costs(tempo, key, energy, t0, k0, e0):
+    """Cost of moving from a track with (t0, k0, e0) to each of the given tracks."""
+    return (np.abs(tempo - t0) / TEMPO_STEP
+            + key_distance(key, k0) / KEY_STEP
+            + np.abs(energy - e0) / ENERGY_STEP)
+
+
+def smooth_order(tempo, key, energy, count: int, start=None):
+    """
+    Greedily chains `count` tracks out of the candidate pool, each time taking
+    the unused candidate cheapest to move to from the previous track.
+
+    The chain starts next to `start`, a (tempo, key, energy) tuple for the
+    track played before the pool, or at the slowest candidate. Returns
+    positions into the pool in play order. O(count * pool size).
+    """
+    tempo = np.asarray(tempo, dtype=np.float64)
+    key = np.asarray(key)
+    energy = np.asarray(energy, dtype=np.float64)
+    count = min(count, len(tempo))
+    if count == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    used = np.zeros(len(tempo), dtype=bool)
+    order = np.empty(count, dtype=np.int64)
+    if start is None:
+        current = int(np.argmin(tempo))
+    else:
+        current = int(np.argmin(transition_costs(tempo, key, energy, *start)))
+    for step in range(count):
+        order[step] = current
+        used[current] = True
+        if step + 1 == count:
+            break
+        costs = transition_costs(tempo, key, energy, tempo[current], key[current], energy[current])
+        costs[used] = np.inf
+        current = int(np.argmin(costs))
+    return order
@@ -0,0 +1,27 @@
+import os
+import numpy as np
+
+# Weight kept by the existing profile on every new play: a play from 35 plays
+# ago counts half as much as the latest one at the default of 0.98
+TASTE_DECAY = float(os.getenv("TASTE_DECAY", "0.98"))
+
+
+def update_taste(weighted_sum, total_weight: float, vector, decay: float = TASTE_DECAY):
+    """
+    Folds one played track's scaled feature vector into a recency-decayed
+    running mean, kept as S = S * decay + x and W = W * decay + 1 so the
+    update is O(1) however long the history is. Returns the new (S, W).
+    """
+    vector = np.asarray(vector, dtype=np.float64)
+    if weighted_sum is None or len(weighted_sum) != len(vector):
+        # first play, or the feature set changed since the profile was written
+        weighted_sum, total_weight = np.zeros(len(vector)), 0.0
+    weighted_sum = np.asarray(weighted_sum, dtype=np.float64) * decay + vector
+    return weighted_sum.tolist(), (total_weight or 0.0) * decay + 1.0
+
+
+def taste_vector(weighted_sum, total_weight: float, dimensions: int):
+    """The decayed mean S / W, or None for an empty or outdated profile."""
+    if weighted_sum is None or not total_weight or len(weighted_sum) != dimensions:
+        return None
+    return np.asarray(weighted_sum, dtype=np.float32) / np.float32(total_weight)
@@ -0,0 +1,256 @@
+import json
+import os
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+
+# hnswlib is an optional dependency; the IVF index below only needs numpy/sklearn
+try:
+    import hnswlib
+except ImportError:  # pragma: no cover - optional
+    hnswlib = None
+
+# Which local index serves similarity queries when Pinecone is unavailable:
+# "exact", "ivf", "hnsw" or "auto" (ANN only once the catalog is large enough).
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "auto").lower()
+ANN_MIN_ROWS = int(os.getenv("ANN_MIN_ROWS", "50000"))
+
+# IVF tuning: more lists = faster queries, more probes = better recall
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))  # 0 -> 4 * sqrt(n)
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+
+# HNSW tuning: higher M / ef = better recall, more memory / latency
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+
+
+def normalize_rows(matrix):
+    """L2-normalises each row; all-zero rows are left as zeros."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(scores, k: int):
+    """
+    Indices of the k highest scores, best first, without sorting every score.
+    Ties are broken towards the higher row index, like argsort()[::-1].
+    """
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        part = np.argpartition(-scores, k - 1)[:k]
+    else:
+        part = np.arange(len(scores))
+    return part[np.lexsort((-part, -scores[part]))]
+
+
+class ExactIndex:
+    """
+    Brute-force cosine search. `vectors` must already be L2-normalised so a
+    query is one matrix-vector product plus a partial sort.
+    """
+    kind = "exact"
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def search(self, query, k: int):
+        """Returns (row indices, cosine scores) of the k best rows, best first."""
+        q = normalize_rows(np.asarray(query).reshape(1, -1))[0]
+        scores = self.vectors @ q
+        top = top_k(scores, k)
+        return top, scores[top]
+
+    def search_batch(self, queries, k: int, chunk_size: int = 256):
+        """Searches many queries with one matrix-matrix product per chunk."""
+        queries = normalize_rows(np.asarray(queries).reshape(-1, self.vectors.shape[1]))
+        results = []
+        for start in range(0, len(queries), chunk_size):
+            scores = queries[start:start + chunk_size] @ self.vectors.T
+            for row in scores:
+                top = top_k(row, k)
+                results.append((top, row[top]))
+        return results
+
+
+class IVFIndex:
+    """
+    Inverted-file index: rows are bucketed by their nearest k-means centroid
+    and a query only scores the rows in its `nprobe` closest buckets.
+    """
+    kind = "ivf"
+
+    def __init__(self, vectors, centroids, offsets, rows, nprobe: int = IVF_NPROBE):
+        self.vectors = vectors
+        self.centroids = centroids
+        self.offsets = offsets
+        self.rows = rows
+        self.nprobe = max(1, min(nprobe, len(centroids)))
+
+    @classmethod
+    def build(cls, unit, nlist: int = IVF_NLIST, nprobe: int = IVF_NPROBE):
+        n = len(unit)
+        if nlist <= 0:
+            nlist = int(4 * np.sqrt(n))
+        nlist = max(1, min(nlist, n))
+
+        kmeans = MiniBatchKMeans(n_clusters=nlist, random_state=42, n_init=3, batch_size=4096)
+        kmeans.fit(unit)
+        centroids = normalize_rows(kmeans.cluster_centers_)
+
+        # assign by inner product so buckets agree with the cosine metric
+        assignments = np.empty(n, dtype=np.int32)
+        for start in range(0, n, 65536):
+            chunk = unit[start:start + 65536]
+            assignments[start:start + 65536] = np.argmax(chunk @ centroids.T, axis=1)
+
+        rows = np.argsort(assignments, kind="stable").astype(np.int32)
+        counts = np.bincount(assignments, minlength=nlist)
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(unit, centroids, offsets, rows, nprobe)
+
+    def save(self, path: str, version: str):
+        # services sharing the data dir save at boot; write to a temp file
+        # first so none of them loads a half-written index
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, centroids=self.centroids, offsets=self.offsets, rows=self.rows,
+                     version=np.array(version))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, unit, version: str, nprobe: int = IVF_NPROBE):
+        """Loads a persisted index, or returns None if it was built for another dataset."""
+        with np.load(path) as data:
+            if str(data["version"]) != version or int(data["offsets"][-1]) != len(unit):
+                return None
+            return cls(unit, data["centroids"], data["offsets"], data["rows"], nprobe)
+
+    def search(self, query, k: int):
+        q = normalize_rows(np.asarray(query).reshape(1, -1))[0]
+        centroid_scores = self.centroids @ q
+        probes = np.argpartition(-centroid_scores, self.nprobe - 1)[:self.nprobe]
+        candidates = np.concatenate([self.rows[self.offsets[c]:self.offsets[c + 1]] for c in probes])
+
+        if len(candidates) < k:
+            # probed buckets are too small to fill the page; widen to every bucket
+            candidates = self.rows
+
+        scores = self.vectors[candidates] @ q
+        order = top_k(scores, k)
+        return candidates[order], scores[order]
+
+    def search_batch(self, queries, k: int):
+        return [self.search(q, k) for q in queries]
+
+
+class HNSWIndex:
+    """Hierarchical navigable small-world graph backed by hnswlib."""
+    kind = "hnsw"
+
+    def __init__(self, index, ef_search: int = HNSW_EF_SEARCH):
+        self.index = index
+        self.index.set_ef(ef_search)
+
+    @classmethod
+    def build(cls, vectors, m: int = HNSW_M, ef_construction: int = HNSW_EF_CONSTRUCTION,
+              ef_search: int = HNSW_EF_SEARCH):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        index = hnswlib.Index(space="cosine", dim=vectors.shape[1])
+        index.init_index(max_elements=len(vectors), ef_construction=ef_construction, M=m)
+        index.add_items(vectors, np.arange(len(vectors)))
+        return cls(index, ef_search)
+
+    def save(self, path: str, version: str):
+        # same temp-file-then-rename as IVFIndex.save, for the graph and then
+        # its metadata, so the metadata never vouches for a partial graph
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        self.index.save_index(tmp_path)
+        os.replace(tmp_path, path)
+        with open(tmp_path, "w") as f:
+            json.dump({"version": version, "count": self.index.get_current_count()}, f)
+        os.replace(tmp_path, path + ".json")
+
+    @classmethod
+    def load(cls, path: str, vectors, version: str, ef_search: int = HNSW_EF_SEARCH):
+        """Loads a persisted index, or returns None if it was built for another dataset."""
+        meta_path = path + ".json"
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("version") != version or meta.get("count") != len(vectors):
+            return None
+        index = hnswlib.Index(space="cosine", dim=vectors.shape[1])
+        index.load_index(path, max_elements=len(vectors))
+        return cls(index, ef_search)
+
+    def search(self, query, k: int):
+        k = min(k, self.index.get_current_count())
+        self.index.set_ef(max(HNSW_EF_SEARCH, k))
+        labels, distances = self.index.knn_query(np.asarray(query, dtype=np.float32).reshape(1, -1), k=k)
+        return labels[0].astype(np.int64), 1.0 - distances[0]
+
+    def search_batch(self, queries, k: int):
+        """hnswlib answers a whole batch of queries in one (multi-threaded) call."""
+        k = min(k, self.index.get_current_count())
+        self.index.set_ef(max(HNSW_EF_SEARCH, k))
+        labels, distances = self.index.knn_query(np.asarray(queries, dtype=np.float32), k=k)
+        return [(l.astype(np.int64), 1.0 - d) for l, d in zip(labels, distances)]
+
+
+INDEX_FILES = {
+    "ivf": ("ivf_index.npz", IVFIndex),
+    "hnsw": ("hnsw_index.bin", HNSWIndex),
+}
+
+
+def resolve_kind(n_rows: int, kind: str = VECTOR_INDEX):
+    """Turns the configured index kind into the one that will actually be used."""
+    if kind == "auto":
+        if n_rows < ANN_MIN_ROWS:
+            return "exact"
+        if hnswlib is None:
+            print(f"⚠️  hnswlib not installed; VECTOR_INDEX=auto falls back to the IVF index "
+                  f"(nprobe={IVF_NPROBE}), which has lower recall. Install hnswlib or set VECTOR_INDEX=exact.")
+            return "ivf"
+        print(f"🔎 {n_rows} tracks >= ANN_MIN_ROWS={ANN_MIN_ROWS}; VECTOR_INDEX=auto picked the hnsw index.")
+        return "hnsw"
+    if kind == "hnsw" and hnswlib is None:
+        print("⚠️  hnswlib not installed; using the IVF index instead.")
+        kind = "ivf"
+    if kind not in INDEX_FILES:
+        kind = "exact"
+    return kind
+
+
+def build_vector_index(vectors, data_dir: str, version: str, kind: str = VECTOR_INDEX):
+    """
+    Returns a local similarity index over the L2-normalised `vectors`.
+    ANN indexes are loaded from `data_dir` when a copy built for the same
+    dataset version exists, otherwise they are built and persisted there.
+    """
+    kind = resolve_kind(len(vectors), kind)
+    if kind == "exact" or len(vectors) == 0:
+        return ExactIndex(vectors)
+
+    filename, index_cls = INDEX_FILES[kind]
+    path = os.path.join(data_dir, filename)
+    if os.path.exists(path):
+        try:
+            index = index_cls.load(path, vectors, version)
+            if index is not None:
+                return index
+        except Exception as e:
+            print(f"⚠️  Could not load {kind} index from {path}: {e}")
+
+    print(f"🔨 Building {kind} similarity index for {len(vectors)} tracks...")
+    index = index_cls.build(vectors)
+    try:
+        index.save(path, version)
+    except OSError as e:
+        print(f"⚠️  Could not persist {kind} index to {path}: {e}")
+    return index
@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+
+# Add backend and services directories to path to allow imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "services"))
+
+from recommender import DATA_DIR
+from factorization import ALS_FACTORS, ALS_ITERATIONS, interaction_matrix, train_als, write_factors
+from shared.database import SessionLocal
+from shared.models import ListeningHistory
+
+ALS_WORKERS = int(os.getenv("ALS_WORKERS", str(os.cpu_count() or 1)))
+# listening_history rows fetched per round trip
+FETCH_BATCH_SIZE = int(os.getenv("FETCH_BATCH_SIZE", "100000"))
+
+
+def load_listening_events():
+    """(user_ids, track_ids, interaction_types) of every listening event."""
+    db = SessionLocal()
+    user_ids, track_ids, interaction_types = [], [], []
+    last_id = 0
+    try:
+        while True:
+            rows = db.query(
+                ListeningHistory.id, ListeningHistory.user_id,
+                ListeningHistory.track_id, ListeningHistory.interaction_type,
+            ).filter(ListeningHistory.id > last_id).order_by(ListeningHistory.id).limit(FETCH_BATCH_SIZE).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            for _, user_id, track_id, kind in rows:
+                user_ids.append(user_id)
+                track_ids.append(track_id)
+                interaction_types.append(kind)
+    finally:
+        db.close()
+    return user_ids, track_ids, interaction_types
+
+
+def train():
+    print("📊 Loading listening history...")
+    user_ids, track_ids, interaction_types = load_listening_events()
+    if not track_ids:
+        print("❌ No listening history to train on.")
+        return
+
+    users, items, matrix = interaction_matrix(user_ids, track_ids, interaction_types)
+    print(f"🚀 Training {ALS_FACTORS} factors for {len(users)} users x {len(items)} tracks "
+          f"({matrix.nnz} pairs) over {ALS_ITERATIONS} iterations with {ALS_WORKERS} workers...")
+    start = time.time()
+    user_factors, item_factors = train_als(matrix, workers=ALS_WORKERS)
+
+    write_factors(DATA_DIR, users, items, user_factors, item_factors)
+    print(f"🏁 Factors written to {DATA_DIR} in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    train()
@@ -1,6 +1,13 @@
+from sqlalchemy import text
 from database import engine, Base
 import models
 
+# Indexes added to existing tables after they were first created; create_all
+# skips tables that already exist, so these are created explicitly.
+ADDED_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_listening_history_user_id ON listening_history (user_id)",
+]
+
 def migrate():
     print("Migrating schema...")
     # SQL Alchemy sync doesn't handle migrations well (dropping/altering columns)
@@ -10,6 +17,9 @@ def migrate():
     
     try:
         models.Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            for statement in ADDED_INDEXES:
+                conn.execute(text(statement))
         print("Schema migration attempted.")
         print("Note: If using SQLite and 'playlists' table already existed, 'user_id' column might be missing.")
         print("For Dev MVP: We might need to recreate the database if columns are missing.")
@@ -0,0 +1,75 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler
+from sklearn.metrics.pairwise import cosine_similarity
+
+# Add backend directory to path to allow imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from recommender import DATASET_PATH, FEATURE_COLS
+from vector_index import ExactIndex, normalize_rows
+
+# Checks that the float32 / argpartition exact search ranks tracks the same way
+# as the original cosine_similarity + argsort implementation.
+
+N_SEEDS = 200
+LIMIT = 20
+# float32 scores differ from float64 ones around the 7th decimal
+TOLERANCE = 1e-5
+
+
+def load_features():
+    if os.path.exists(DATASET_PATH):
+        print(f"Using dataset at {DATASET_PATH}")
+        df = pd.read_csv(DATASET_PATH)
+        return MinMaxScaler().fit_transform(df[FEATURE_COLS])
+    print("Dataset not found, using a random catalog of 50000 tracks")
+    rng = np.random.default_rng(42)
+    return rng.random((50000, len(FEATURE_COLS)))
+
+
+def reference_ranking(scaled_features, seed_idx, limit):
+    """The ranking get_recommendations produced before the exact search rewrite."""
+    sim = cosine_similarity([scaled_features[seed_idx].tolist()], scaled_features).flatten()
+    ranked = [idx for idx in sim.argsort()[::-1] if idx != seed_idx][:limit]
+    return np.array(ranked), sim
+
+
+def verify_exact_search():
+    scaled_features = load_features()
+    index = ExactIndex(normalize_rows(scaled_features.astype(np.float32)))
+
+    rng = np.random.default_rng(0)
+    seeds = rng.choice(len(scaled_features), size=min(N_SEEDS, len(scaled_features)), replace=False)
+
+    identical = 0
+    failures = 0
+    for seed_idx in seeds:
+        expected, sim = reference_ranking(scaled_features, seed_idx, LIMIT)
+
+        rows, scores = index.search(scaled_features[seed_idx], LIMIT + 1)
+        keep = rows != seed_idx
+        rows, scores = rows[keep][:LIMIT], scores[keep][:LIMIT]
+
+        # Rankings may only differ between tracks whose float64 scores tie
+        # within float32 precision, so compare reference scores position by position.
+        if len(rows) != len(expected) or not np.allclose(sim[rows], sim[expected], atol=TOLERANCE):
+            failures += 1
+            print(f"Mismatch for seed row {seed_idx}: expected {expected.tolist()}, got {rows.tolist()}")
+            continue
+        if not np.allclose(scores, sim[rows], atol=TOLERANCE):
+            failures += 1
+            print(f"Score mismatch for seed row {seed_idx}")
+            continue
+        if np.array_equal(rows, expected):
+            identical += 1
+
+    print(f"Checked {len(seeds)} seeds: {identical} identical rankings, "
+          f"{len(seeds) - identical - failures} equal up to float32 ties, {failures} mismatches")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verify_exact_search() else 1)
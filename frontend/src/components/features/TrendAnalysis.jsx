@@ -52,8 +52,8 @@ const TrendAnalysis = () => {
     if (!trends) return <div className="error-message">Failed to load trend data.</div>;
 
     const timelineData = {
-        labels: trends.simulated_timeline.months,
-        datasets: trends.simulated_timeline.trends.map((t, i) => ({
+        labels: trends.timeline.months,
+        datasets: trends.timeline.trends.map((t, i) => ({
             label: t.genre,
             data: t.data,
             borderColor: `hsl(${i * 60}, 70%, 50%)`,
@@ -78,7 +78,7 @@ const TrendAnalysis = () => {
                 <Card style={{ padding: '2rem' }}>
                     <div className="flex-row" style={{ marginBottom: '1.5rem', gap: '1rem' }}>
                         <TrendingUp size={24} color="var(--accent-primary)" />
-                        <h3>Rising Genres (Simulated Tends)</h3>
+                        <h3>Genre Plays by Month</h3>
                     </div>
                     <div style={{ height: '300px' }}>
                         <Line
@@ -3,6 +3,9 @@ import time
 import sys
 import os
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from catalog import CATALOG_DIR_NAME, publish_catalog
+
 services = [
     {"name": "Auth Service", "path": "backend/services/auth_service/main.py", "port": 8001},
     {"name": "Recommender Service", "path": "backend/services/recommender_service/main.py", "port": 8002},
@@ -24,10 +27,22 @@ if not os.path.exists(data_path):
         print("Failed to run clean_data.py automatically.", e)
         print("Please create 'data/cleaned_dataset.csv' manually before starting services.")
 
+# publish the columnar catalog once so every service maps the same read-only pages
+catalog_path = os.path.join(os.getcwd(), "data", CATALOG_DIR_NAME)
+if os.path.exists(data_path) and not os.path.exists(catalog_path):
+    print("⚠️  Columnar catalog not found. Exporting it from the cleaned dataset.")
+    subprocess.run([sys.executable, "backend/clean_data.py"])
+
+service_env = dict(os.environ)
+shared_catalog = publish_catalog(catalog_path)
+if shared_catalog:
+    print(f"🧠 Sharing catalog from {shared_catalog}")
+    service_env["CATALOG_DIR"] = shared_catalog
+
 for service in services:
     print(f"📦 Launching {service['name']} on port {service['port']}...")
     # Use the same python interpreter
-    process = subprocess.Popen([sys.executable, service['path']])
+    process = subprocess.Popen([sys.executable, service['path']], env=service_env)
     processes.append(process)
 
 print("\n✅ All services are running.")